@@ -0,0 +1,67 @@
+"""
+Compare FastAPI's default JSON encoding with FastJSONResponse on todo-shaped payloads.
+
+    python -m benchmarks.bench_json --sizes 1000,10000,100000
+
+"default" is jsonable_encoder followed by starlette's JSONResponse (json.dumps); ObjectIds are pre-converted to
+strings because the default path cannot encode them. "fast" hands the raw documents, ObjectIds included, to
+FastJSONResponse.
+"""
+import argparse
+import json
+import orjson
+import sys
+import time
+
+from typing import List
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse
+
+from benchmarks.run_benchmarks import percentile
+from utils.responses import FastJSONResponse
+
+
+def documents(size: int) -> List[dict]:
+    return [{"_id": ObjectId(), "id": index, "title": f"Benchmark {index}", "description": "Seeded by benchmark",
+             "completed": index % 2 == 0} for index in range(1, size + 1)]
+
+
+def default_path(rows: List[dict]) -> bytes:
+    return JSONResponse(jsonable_encoder([{**row, "_id": str(row["_id"])} for row in rows])).body
+
+
+def fast_path(rows: List[dict]) -> bytes:
+    return FastJSONResponse(rows).body
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    print(f"encoder: orjson {orjson.__version__}")
+    results = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        rows = documents(size)
+        assert json.loads(default_path(rows)) == json.loads(fast_path(rows))
+        for name, path in (("default", default_path), ("fast", fast_path)):
+            samples = []
+            for _ in range(args.iterations):
+                started = time.perf_counter()
+                path(rows)
+                samples.append(time.perf_counter() - started)
+            results.append({"path": name, "size": size, "p50_ms": percentile(samples, 0.5) * 1000,
+                            "p99_ms": percentile(samples, 0.99) * 1000})
+            print(f"{name:>8} n={size:<8} p50={results[-1]['p50_ms']:.2f}ms p99={results[-1]['p99_ms']:.2f}ms")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"results": results}, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
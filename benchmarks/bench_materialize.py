@@ -0,0 +1,69 @@
+"""
+Compare the per-row materialization path with the batch path used by the list endpoints.
+
+    python -m benchmarks.bench_materialize --sizes 10000,100000
+
+"per_row" is what GET / used to do: one ToDoModel(**row) per document, then FastAPI validating the list again
+against the route's response_model and JSON-encoding it. "batch" is the current path: one TypeAdapter validation
+of the whole list and a direct dump to JSON bytes.
+"""
+import argparse
+import json
+import sys
+import time
+
+from typing import Any, Dict, List, Union
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from benchmarks.run_benchmarks import percentile
+from models.todo_model import ToDoModel, materialize_todos, todo_list_adapter_for
+
+response_adapter = TypeAdapter(Union[List[ToDoModel], List[Dict[str, Any]], Dict[str, Any]])
+
+
+def stored_rows(size: int) -> List[dict]:
+    return [{"_id": ObjectId(), "id": index, "title": f"Benchmark {index}", "description": "Seeded by benchmark",
+             "completed": index % 2 == 0, "version": 1} for index in range(1, size + 1)]
+
+
+def per_row(rows: List[dict]) -> bytes:
+    todos = [ToDoModel(**row) for row in rows]
+    validated = response_adapter.validate_python(todos)
+    return json.dumps(jsonable_encoder(response_adapter.dump_python(validated, mode="json"))).encode()
+
+
+def batch(rows: List[dict]) -> bytes:
+    return todo_list_adapter_for(None).dump_json(materialize_todos(rows))
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in [int(size) for size in args.sizes.split(",")]:
+        rows = stored_rows(size)
+        assert json.loads(per_row(rows)) == json.loads(batch(rows))
+        for name, path in (("per_row", per_row), ("batch", batch)):
+            samples = []
+            for _ in range(args.iterations):
+                started = time.perf_counter()
+                path(rows)
+                samples.append(time.perf_counter() - started)
+            results.append({"path": name, "size": size, "p50_ms": percentile(samples, 0.5) * 1000,
+                            "p99_ms": percentile(samples, 0.99) * 1000})
+            print(f"{name:>8} n={size:<8} p50={results[-1]['p50_ms']:.1f}ms p99={results[-1]['p99_ms']:.1f}ms")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"results": results}, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Compare concurrent POST / style inserts with and without the write batcher.
+
+    python -m benchmarks.bench_write_batching --backend mongo --concurrency 1,16,64,256
+
+Each round submits ``concurrency`` AsyncToDoServices.add_todo calls at once and waits for all of them; throughput is
+inserts per second over all rounds, latency is per round. With ``--backend mongo`` point ``TODO_MONGO_URI`` at a
+scratch server, since the collection is emptied first.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from typing import List
+
+from benchmarks.run_benchmarks import percentile
+from utils.config import settings
+
+
+async def run(concurrency: int, rounds: int, batcher) -> dict:
+    from models.todo_model import ToDoModel
+    from services.async_todo_services import AsyncToDoServices
+
+    services = AsyncToDoServices()
+    services.write_batcher = batcher(services._insert_batch) if batcher is not None else None
+    todo = ToDoModel(id=0, title="Benchmark insert", description="Inserted by bench_write_batching", completed=False)
+    await services.delete_all_todos()
+
+    samples = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        round_started = time.perf_counter()
+        results = await asyncio.gather(*(services.add_todo(todo) for _ in range(concurrency)))
+        samples.append(time.perf_counter() - round_started)
+        assert all(result.get("error") is None for result in results)
+    elapsed = time.perf_counter() - started
+
+    await services.delete_all_todos()
+    services.db.close()
+    return {"concurrency": concurrency, "round_p50_ms": percentile(samples, 0.5) * 1000,
+            "round_p99_ms": percentile(samples, 0.99) * 1000, "inserts_per_sec": concurrency * rounds / elapsed}
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--concurrency", default="1,16,64,256", help="comma-separated concurrent inserts per round")
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--max-batch-size", type=int, default=settings.write_batch_max_size)
+    parser.add_argument("--max-delay-ms", type=float, default=settings.write_batch_max_delay_ms)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    settings.storage_backend = args.backend
+    from utils.write_batcher import WriteBatcher
+
+    def batcher(insert_many):
+        return WriteBatcher(insert_many, args.max_batch_size, args.max_delay_ms / 1000)
+
+    results = []
+    for concurrency in [int(concurrency) for concurrency in args.concurrency.split(",")]:
+        for name, factory in (("direct", None), ("batched", batcher)):
+            result = {"path": name, **asyncio.run(run(concurrency, args.rounds, factory))}
+            results.append(result)
+            print(f"{name:>8} c={concurrency:<5} round p50={result['round_p50_ms']:.2f}ms "
+                  f"p99={result['round_p99_ms']:.2f}ms {result['inserts_per_sec']:.0f} inserts/s")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"backend": args.backend, "results": results}, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+"""
+Latency/throughput benchmarks for the store, services and routes layers.
+
+    python -m benchmarks.run_benchmarks --backend memory --sizes 1000,100000 --output bench.json
+    python -m benchmarks.run_benchmarks --sizes 1000,100000 --baseline bench.json
+
+Every run reseeds ``todo_list_db.todo_list_collection``. With ``--backend mongo`` point ``TODO_MONGO_URI`` at a
+scratch server, since the collection is emptied before each size.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import platform
+import random
+import sys
+import time
+
+from typing import Any, Callable, Dict, List
+
+from utils.config import settings
+
+DB_NAME = "todo_list_db"
+COLLECTION_NAME = "todo_list_collection"
+SEED_BATCH_SIZE = 10000
+
+# Operations that must not get slower as the collection grows; anything else may legitimately scale with size.
+CONSTANT_TIME_OPERATIONS = {
+    "get_document_by_id", "get_documents_page", "add_document", "update_document_by_id",
+    "get_todo_by_id", "get_todos_page", "add_todo",
+    "GET /{id}", "GET /?limit=100", "POST /",
+}
+# Whole-collection reads; they scale with size, so they run fewer iterations
+LIST_OPERATIONS = {"get_all_documents", "get_all_todos", "GET /"}
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(layer: str, operation: str, size: int, samples: List[float], elapsed: float) -> Dict[str, Any]:
+    return {
+        "layer": layer,
+        "operation": operation,
+        "size": size,
+        "iterations": len(samples),
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "ops_per_sec": len(samples) / elapsed if elapsed else 0.0
+    }
+
+
+async def measure(call: Callable[[], Any], iterations: int, warmup: int = 5) -> tuple:
+    # Store and services calls are synchronous; routes return awaitables and run on the event loop.
+    async def invoke():
+        result = call()
+        if inspect.isawaitable(result):
+            await result
+
+    for _ in range(warmup):
+        await invoke()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        await invoke()
+        samples.append(time.perf_counter() - call_started)
+    return samples, time.perf_counter() - started
+
+
+def seed(store, size: int):
+    store.delete_all_documents(DB_NAME, COLLECTION_NAME, {})
+    for offset in range(0, size, SEED_BATCH_SIZE):
+        batch = min(SEED_BATCH_SIZE, size - offset)
+        store.add_documents(DB_NAME, COLLECTION_NAME, [
+            {"id": 0, "title": f"Benchmark {offset + index}", "description": "Seeded by run_benchmarks",
+             "completed": (offset + index) % 2 == 0}
+            for index in range(batch)
+        ])
+
+
+async def run_size(size: int, iterations: int, list_iterations: int, layers: List[str],
+                   rng: random.Random) -> List[Dict[str, Any]]:
+    import httpx
+
+    from models.todo_model import ToDoModel
+    from routes.todo_routes import router, todo_services as async_services
+    from services.todo_services import ToDoServices
+
+    store = async_services.db.db_store
+    services = ToDoServices(store)
+    seed(store, size)
+
+    def random_id() -> int:
+        return rng.randint(1, size)
+
+    new_todo = {"id": 0, "title": "Benchmark insert", "description": "Inserted by run_benchmarks", "completed": False}
+    operations: Dict[str, Dict[str, Callable[[], Any]]] = {
+        "store": {
+            "get_document_by_id": lambda: store.get_document_by_id(DB_NAME, COLLECTION_NAME, random_id()),
+            "get_documents_page": lambda: store.get_documents_page(DB_NAME, COLLECTION_NAME, 100, random_id()),
+            "add_document": lambda: store.add_document(DB_NAME, COLLECTION_NAME, dict(new_todo)),
+            "update_document_by_id": lambda: store.update_document_by_id(DB_NAME, COLLECTION_NAME, random_id(),
+                                                                         {"completed": True}),
+            "get_all_documents": lambda: store.get_all_documents(DB_NAME, COLLECTION_NAME),
+        },
+        "services": {
+            "get_todo_by_id": lambda: services.get_todo_by_id(random_id()),
+            "get_todos_page": lambda: services.get_todos_page(100, random_id()),
+            "add_todo": lambda: services.add_todo(ToDoModel(**new_todo)),
+            "get_all_todos": lambda: services.get_all_todos(),
+        },
+    }
+
+    results = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=router), base_url="http://bench") as client:
+        operations["routes"] = {
+            "GET /{id}": lambda: client.get(f"/{random_id()}"),
+            "GET /?limit=100": lambda: client.get("/", params={"limit": 100, "after_id": random_id()}),
+            "POST /": lambda: client.post("/", json=new_todo),
+            "GET /": lambda: client.get("/"),
+        }
+        for layer in layers:
+            for operation, call in operations[layer].items():
+                count = list_iterations if operation in LIST_OPERATIONS else iterations
+                samples, elapsed = await measure(call, count, warmup=min(5, count))
+                results.append(summarize(layer, operation, size, samples, elapsed))
+                print(f"{layer:>8} {operation:<24} n={size:<9} p50={results[-1]['p50_ms']:.3f}ms "
+                      f"p99={results[-1]['p99_ms']:.3f}ms {results[-1]['ops_per_sec']:.0f} ops/s")
+
+    store.delete_all_documents(DB_NAME, COLLECTION_NAME, {})
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]], tolerance: float) -> List[str]:
+    """
+    Return a message for every result whose p50 is more than ``tolerance`` slower than the matching baseline entry.
+    """
+    previous = {(entry["layer"], entry["operation"], entry["size"]): entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        reference = previous.get((entry["layer"], entry["operation"], entry["size"]))
+        if reference and entry["p50_ms"] > reference["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{entry['layer']} {entry['operation']} n={entry['size']}: p50 "
+                               f"{reference['p50_ms']:.3f}ms -> {entry['p50_ms']:.3f}ms")
+    return regressions
+
+
+def check_scaling(results: List[Dict[str, Any]], limit: float) -> List[str]:
+    """
+    Flag constant-time operations whose p50 at the largest size exceeds ``limit`` times the p50 at the smallest.
+    """
+    by_operation: Dict[tuple, List[Dict[str, Any]]] = {}
+    for entry in results:
+        if entry["operation"] in CONSTANT_TIME_OPERATIONS:
+            by_operation.setdefault((entry["layer"], entry["operation"]), []).append(entry)
+
+    violations = []
+    for (layer, operation), entries in by_operation.items():
+        entries.sort(key=lambda entry: entry["size"])
+        smallest, largest = entries[0], entries[-1]
+        if len(entries) > 1 and largest["p50_ms"] > smallest["p50_ms"] * limit:
+            violations.append(f"{layer} {operation}: p50 {smallest['p50_ms']:.3f}ms at n={smallest['size']} -> "
+                              f"{largest['p50_ms']:.3f}ms at n={largest['size']}")
+    return violations
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["memory", "mongo"], default="memory")
+    parser.add_argument("--sizes", default="1000,100000", help="comma-separated collection sizes")
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--list-iterations", type=int, default=10, help="iterations for whole-collection reads")
+    parser.add_argument("--layers", default="store,services,routes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown against the baseline")
+    parser.add_argument("--scaling-limit", type=float, default=5.0,
+                        help="allowed p50 growth of constant-time operations from the smallest to the largest size")
+    args = parser.parse_args(argv)
+
+    # The routes module builds its services at import time, so the backend has to be chosen before that import.
+    settings.storage_backend = args.backend
+    sizes = [int(size) for size in args.sizes.split(",")]
+    layers = args.layers.split(",")
+    rng = random.Random(args.seed)
+
+    async def run_all():
+        results = []
+        for size in sizes:
+            results.extend(await run_size(size, args.iterations, args.list_iterations, layers, rng))
+        return results
+
+    results = asyncio.run(run_all())
+    report = {
+        "meta": {"backend": args.backend, "iterations": args.iterations, "seed": args.seed,
+                 "python": platform.python_version(), "timestamp": time.time()},
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    failures = check_scaling(results, args.scaling_limit)
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            failures += compare(results, json.load(baseline)["results"], args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+from contextlib import asynccontextmanager
+from fastapi import FastAPI
+
+from routes import admin_routes, metrics_routes, todo_routes
+from utils.config import settings
+from utils.event_bus import ChangeStreamFeeder, event_bus
+from utils.logger import RequestIdMiddleware, configure_logging, get_logger, shutdown_logging
+from utils.metrics import MetricsMiddleware
+from utils.mongo_client import open_client, close_client, get_client
+
+logger = get_logger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging(settings)
+    open_client(settings)
+    result = await todo_routes.todo_services.ensure_indexes()
+    if result.get("error") is not None:
+        # Existing data can block an index build (e.g. duplicate ids left by the old id race); the app still serves
+        # and GET /admin/indexes reports what is missing until POST /admin/indexes succeeds
+        logger.error("Could not create todo indexes", extra={"error": result.get("error")})
+    feeder = None
+    if settings.event_source == "change_stream":
+        feeder = ChangeStreamFeeder(event_bus, get_client()["todo_list_db"]["todo_list_collection"])
+        feeder.start()
+    yield
+    if feeder is not None:
+        feeder.stop()
+    if todo_routes.todo_services.write_batcher is not None:
+        await todo_routes.todo_services.write_batcher.drain()
+    todo_routes.todo_services.db.close()
+    close_client()
+    shutdown_logging()
+
+
+app = FastAPI(lifespan=lifespan)
+# /metrics has to be matched before the todo router's /{id}
+app.include_router(metrics_routes.router)
+app.include_router(todo_routes.router)
+app.include_router(admin_routes.router, prefix="/admin")
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
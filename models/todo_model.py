@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from functools import lru_cache
+from typing import Any, Iterable, List, Mapping, Optional, Tuple, Type
+from pydantic import BaseModel, Field, TypeAdapter, create_model
 
 
 class ToDoModel(BaseModel):
@@ -6,3 +8,48 @@ class ToDoModel(BaseModel):
     title: str
     description: str
     completed: bool
+    # Maintained by the store and only used for ETags, so it never appears in request or response bodies
+    version: int = Field(0, exclude=True)
+
+
+class ToDoBulkUpdateModel(BaseModel):
+    id: int
+    fields: dict
+
+
+@lru_cache(maxsize=None)
+def partial_todo_model(fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    Build (once per field set) a model holding only ``fields`` of ToDoModel, for projected reads.
+    """
+    definitions = {
+        name: (Optional[field.annotation], None)
+        for name, field in ToDoModel.model_fields.items() if name in fields and name != "version"
+    }
+    definitions["version"] = (int, Field(0, exclude=True))
+    return create_model(f"ToDoModel_{'_'.join(fields)}", **definitions)
+
+
+def todo_model_for(fields: Optional[List[str]]) -> Type[BaseModel]:
+    if fields is None:
+        return ToDoModel
+    return partial_todo_model(tuple(sorted(set(fields) | {"id"})))
+
+
+@lru_cache(maxsize=None)
+def _todo_list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def todo_list_adapter_for(fields: Optional[List[str]]) -> TypeAdapter:
+    """
+    The (cached) TypeAdapter for a list of todos with the given projection, for batch validation and JSON dumps.
+    """
+    return _todo_list_adapter(todo_model_for(fields))
+
+
+def materialize_todos(documents: Iterable[Mapping[str, Any]], fields: Optional[List[str]] = None) -> List[BaseModel]:
+    """
+    Turn stored documents into todo models with a single batch validation instead of one model call per row.
+    """
+    return todo_list_adapter_for(fields).validate_python(list(documents))
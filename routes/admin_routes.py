@@ -0,0 +1,45 @@
+from typing import Dict, Any
+from fastapi import APIRouter, HTTPException
+
+from routes.todo_routes import todo_services
+
+router = APIRouter()
+
+
+@router.get("/indexes", response_model=Dict[str, Any])
+async def get_index_report_route() -> Dict[str, Any]:
+    """
+    Report how the todo collection's indexes compare with the declared index registry.
+
+    Returns:
+    - dict: Declared indexes plus the ones that are missing, not declared, or have never served a query.
+
+    Raises:
+    - HTTPException: If the index information cannot be read, an HTTPException with status code 500 will be raised.
+    """
+    result = await todo_services.check_indexes()
+    if result.get("error") is not None:
+        raise HTTPException(status_code=500, detail=result.get("error"))
+    return result
+
+
+@router.post("/indexes", response_model=Dict[str, Any])
+async def ensure_indexes_route() -> Dict[str, Any]:
+    result = await todo_services.ensure_indexes()
+    if result.get("error") is not None:
+        raise HTTPException(status_code=500, detail=result.get("error"))
+    return result
+
+
+@router.get("/cache", response_model=Dict[str, Any])
+async def get_cache_stats_route() -> Dict[str, Any]:
+    if todo_services.cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **todo_services.cache.stats()}
+
+
+@router.get("/single-flight", response_model=Dict[str, Any])
+async def get_single_flight_stats_route() -> Dict[str, Any]:
+    if todo_services.single_flight is None:
+        return {"enabled": False}
+    return {"enabled": True, **todo_services.single_flight.stats()}
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Response
+
+from utils.metrics import registry
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics_route() -> Response:
+    """
+    Expose request, storage and Mongo pool metrics in the Prometheus text format.
+
+    Returns:
+    - Response: Every registered metric family as plain text.
+    """
+    return Response(content=registry.render(), media_type=registry.content_type)
@@ -1,12 +1,112 @@
-from typing import List, Dict, Any, Union
-from fastapi import APIRouter, HTTPException
+import base64
+import json
+import re
+
+from typing import List, Dict, Any, Union, Optional, Tuple
+from fastapi import APIRouter, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from pydantic import ValidationError, parse_obj_as
 
-from models.todo_model import ToDoModel
-from services.todo_services import ToDoServices
+from models.todo_model import ToDoModel, ToDoBulkUpdateModel, todo_list_adapter_for
+from services.async_todo_services import AsyncToDoServices
+from utils.config import settings
+from utils.etag import document_etag, etag_matches, list_etag, version_from_etag
+from utils.event_bus import event_bus, sse_stream
+from utils.responses import FastJSONResponse, dumps
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Fields GET / may sort by; each is backed by an index in ToDoDBStore.index_registry
+SORTABLE_FIELDS = ("id", "title", "completed")
+
+router = APIRouter(default_response_class=FastJSONResponse)
+todo_services = AsyncToDoServices()
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if fields is None:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in ToDoModel.model_fields or field == "version"]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Error! Unknown fields requested: {', '.join(unknown)}")
+    return requested
+
+
+def strip_internal_fields(document: dict) -> dict:
+    return {key: value for key, value in document.items() if key not in ("_id", "version")}
+
+
+def parse_sort(sort: Optional[str]) -> Optional[Tuple[str, int]]:
+    if sort is None:
+        return None
+    field, direction = (sort[1:], -1) if sort.startswith("-") else (sort, 1)
+    if field not in SORTABLE_FIELDS:
+        raise HTTPException(status_code=400,
+                            detail=f"Error! Cannot sort by '{field}', expected one of: {', '.join(SORTABLE_FIELDS)}")
+    return field, direction
+
+
+def encode_sort_cursor(value: Any, todo_id: int) -> str:
+    # Opaque to clients; URL safe so it can be sent back as a query parameter as is
+    return base64.urlsafe_b64encode(dumps([value, todo_id])).decode("ascii")
+
+
+def decode_sort_cursor(cursor: str, field: str) -> Tuple[Any, int]:
+    try:
+        value, todo_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Error! 'after' is not a valid cursor")
+    # bool is an int subclass, so the exact types are compared
+    if type(value) is not ToDoModel.model_fields[field].annotation or type(todo_id) is not int:
+        raise HTTPException(status_code=400, detail=f"Error! 'after' is not a cursor for sorting by {field}")
+    return value, todo_id
 
-router = APIRouter()
-todo_services = ToDoServices()
+
+def build_filter_query(completed: Optional[bool], title_prefix: Optional[str], min_id: Optional[int],
+                       max_id: Optional[int]) -> dict:
+    query: Dict[str, Any] = {}
+    if completed is not None:
+        query["completed"] = completed
+    if title_prefix:
+        # Anchored and case sensitive, so Mongo answers it with a bounded scan of the title index
+        query["title"] = {"$regex": f"^{re.escape(title_prefix)}"}
+    id_range = {}
+    if min_id is not None:
+        id_range["$gte"] = min_id
+    if max_id is not None:
+        id_range["$lte"] = max_id
+    if id_range:
+        query["id"] = id_range
+    return query
+
+
+async def query_todos(query: dict, order: Tuple[str, int], limit: Optional[int], after_id: Optional[int],
+                      after: Optional[Tuple[Any, int]], fields: Optional[List[str]]):
+    field, direction = order
+    comparison = "$gt" if direction > 0 else "$lt"
+    if after_id is not None:
+        # Keyset continuation in the direction of the id sort
+        query = {**query, "id": {**query.get("id", {}), comparison: after_id}}
+    if after is not None:
+        # Keyset continuation on (field, id): later values, or the same value with later ids
+        value, last_id = after
+        keyset = {"$or": [{field: {comparison: value}}, {field: value, "id": {comparison: last_id}}]}
+        query = {"$and": [query, keyset]} if query else keyset
+    page_size = limit or (DEFAULT_PAGE_SIZE if after_id is not None or after is not None else 0)
+    # id breaks ties in the same direction, so the {field: 1, id: 1} index serves both orders without a sort
+    sort = [(field, direction)] if field == "id" else [(field, direction), ("id", direction)]
+
+    # One extra row tells whether another page exists without a separate count query
+    results = await todo_services.get_todo_by_query(query, fields, sort, page_size + 1 if page_size else 0)
+    if isinstance(results, dict):
+        return results, None
+    next_cursor = None
+    if page_size and len(results) > page_size:
+        results = results[:page_size]
+        last = results[-1]
+        next_cursor = last.id if field == "id" else encode_sort_cursor(getattr(last, field), last.id)
+    return results, next_cursor
 
 
 @router.post("/", response_model=Dict[str, Any])
@@ -25,11 +125,11 @@ async def create_todo_route(todo_data: dict) -> Dict[str, Any]:
     """
     try:
         todo_model = parse_obj_as(ToDoModel, todo_data)
-        result = todo_services.add_todo(todo_model)
-        result["oid"] = str(result["oid"])
+        result = await todo_services.add_todo(todo_model)
         if isinstance(result, dict) and result.get("error") is not None:
             raise HTTPException(status_code=400, detail=result.get("error"))
-        return result
+        # Returned as a response so the ObjectId reaches the encoder as is instead of failing response_model checks
+        return FastJSONResponse(result)
     except ValidationError as e:
         error_messages = []
         for error in e.errors():
@@ -38,59 +138,293 @@ async def create_todo_route(todo_data: dict) -> Dict[str, Any]:
         raise HTTPException(status_code=400, detail=error_detail)
 
 
-@router.get("/{id}", response_model=Dict[str, Any])
-async def get_todo_route_by_id(id: int) -> Dict[str, Any]:
+@router.post("/bulk", response_model=Dict[str, Any])
+async def create_todos_bulk_route(todos_data: List[dict]) -> Dict[str, Any]:
+    """
+    Create many todos with one validation pass, one id reservation and one unordered insert_many.
+
+    Parameters:
+    - todos_data (list): The todo items to be created.
+
+    Returns:
+    - dict: Inserted and failed counts plus a per-item result holding either the new id and oid or the error.
+
+    Raises:
+    - HTTPException: If any item fails validation, an HTTPException with status code 400 listing every invalid item
+      will be raised and nothing is written.
+    """
     try:
-        index_to_get = None
-        for i, todo in enumerate(todo_services.get_all_todos()):
-            if todo.id == id:
-                index_to_get = i
-                break
-        if index_to_get is None:
-            raise HTTPException(status_code=404, detail=f"Todo with ID {id} not found.")
+        todo_models = todo_list_adapter_for(None).validate_python(todos_data)
+    except ValidationError as e:
+        error_messages = []
+        for error in e.errors():
+            error_messages.append(f"{error['loc'][0]}.{error['loc'][1]}: {error['msg']}")
+        raise HTTPException(status_code=400, detail="\n".join(error_messages))
 
-        retrieved_todo = todo_services.get_todo_by_id(id)
+    result = await todo_services.add_todos(todo_models)
+    if result.get("error") is not None:
+        raise HTTPException(status_code=400, detail=result.get("error"))
+    return FastJSONResponse(result)
 
-    except ValueError:
-        raise HTTPException(status_code=400, detail="Error! 'id' parameter is not an integer value instance")
+
+@router.get("/export")
+async def export_todos_route(batch_size: int = Query(settings.export_batch_size, ge=1, le=10000)) -> StreamingResponse:
+    """
+    Stream every todo as newline-delimited JSON straight from a Mongo cursor, ``batch_size`` documents per chunk.
+    """
+    return StreamingResponse(todo_services.export_todos(batch_size), media_type="application/x-ndjson")
+
+
+@router.get("/search", response_model=Union[List[ToDoModel], List[Dict[str, Any]]])
+async def search_todos_route(q: str = Query(..., min_length=1),
+                             limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                             offset: int = Query(0, ge=0), fields: Optional[str] = None) -> Response:
+    """
+    Full-text search over todo titles and descriptions, best matches first.
+
+    Parameters:
+    - q (str): Words to look for; a todo matches when it contains any of them. Title matches weigh more.
+    - limit (int): Page size.
+    - offset (int): Number of ranked results to skip, taken from the previous page's ``X-Next-Offset`` header.
+    - fields (str): Comma-separated todo fields to return; ``id`` is always included.
+
+    Returns:
+    - list: The matching todos of the page, possibly empty. ``X-Next-Offset`` is set when more results follow.
+
+    Raises:
+    - HTTPException: 400 for unknown fields, 500 if the search itself fails (e.g. the text index is missing).
+    """
+    projected_fields = parse_fields(fields)
+    result = await todo_services.search_todos(q, limit, offset, projected_fields)
+    if result.get("error") is not None:
+        raise HTTPException(status_code=500, detail=result.get("error"))
+
+    headers = {}
+    if result["next_offset"] is not None:
+        headers["X-Next-Offset"] = str(result["next_offset"])
+    return Response(content=todo_list_adapter_for(projected_fields).dump_json(result["todos"]),
+                    media_type="application/json", headers=headers)
+
+
+@router.get("/stats", response_model=Dict[str, Any])
+async def get_stats_route(bucket_size: int = Query(settings.stats_bucket_size, ge=1)) -> Dict[str, Any]:
+    """
+    Count todos in the database with one aggregation instead of shipping the collection to the client.
+
+    Parameters:
+    - bucket_size (int): Width of the id ranges todos are counted in.
+
+    Returns:
+    - dict: ``total``, ``completed`` and ``open`` counts plus ``by_id_range``, a list of ``from``/``to``/``count``
+      entries for every id range holding at least one todo. At most ``stats_max_buckets`` ranges are listed, the
+      lowest ones first; ``truncated`` says whether any were left out.
+
+    Raises:
+    - HTTPException: If the aggregation fails, an HTTPException with status code 500 will be raised.
+    """
+    result = await todo_services.get_stats(bucket_size)
+    if result.get("error") is not None:
+        raise HTTPException(status_code=500, detail=result.get("error"))
+    return result
+
+
+@router.get("/events")
+async def todo_events_route(last_event_id: Optional[int] = Header(None)) -> StreamingResponse:
+    """
+    Stream todo changes as server-sent events (``created``, ``updated``, ``deleted``, ``cleared`` and ``bulk``).
+
+    Parameters:
+    - last_event_id (int): The ``Last-Event-ID`` header a reconnecting EventSource sends; the kept events after it
+      are replayed first.
+
+    Returns:
+    - StreamingResponse: A ``text/event-stream`` whose ``data`` lines are JSON objects with ``id``, ``type``,
+      ``todo_id`` and ``data``. A ``resync`` event means events were lost and the client should refetch. A ``bulk``
+      event carries the ``operation`` and the requested ``ids`` of a bulk write that changed only ``count`` of them,
+      so the client should refetch those ids.
+    """
+    subscription = event_bus.subscribe(last_event_id)
+    return StreamingResponse(sse_stream(subscription, settings.event_heartbeat_seconds),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/{id}", response_model=Dict[str, Any])
+async def get_todo_route_by_id(id: int, response: Response, fields: Optional[str] = None,
+                               if_none_match: Optional[str] = Header(None)) -> Dict[str, Any]:
+    projected_fields = parse_fields(fields)
+    retrieved_todo = await todo_services.get_todo_by_id(id, projected_fields)
+    if retrieved_todo.get("not_found"):
+        raise HTTPException(status_code=404, detail=f"Todo with ID {id} not found.")
+    if retrieved_todo.get("error") is not None:
+        raise HTTPException(status_code=500, detail=retrieved_todo.get("error"))
+
+    etag = document_etag(retrieved_todo, projected_fields)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    retrieved_todo = strip_internal_fields(retrieved_todo)
 
     return {"message": f"Todo with ID {id} retrieved successfully.", "update_todo": retrieved_todo}
 
 
-@router.get("/", response_model=Union[List[ToDoModel], Dict[str, Any]])
-async def get_todo_route_all() -> Union[List[ToDoModel], Dict[str, Any]]:
+@router.get("/", response_model=Union[List[ToDoModel], List[Dict[str, Any]], Dict[str, Any]])
+async def get_todo_route_all(limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+                             after_id: Optional[int] = None, fields: Optional[str] = None,
+                             completed: Optional[bool] = None, title_prefix: Optional[str] = None,
+                             min_id: Optional[int] = None, max_id: Optional[int] = None, sort: Optional[str] = None,
+                             after: Optional[str] = None, if_none_match: Optional[str] = Header(None)) -> Response:
+    """
+    Return todos ordered by id, or by ``sort``. Without ``limit`` or ``after_id`` every matching todo is returned.
+
+    Parameters:
+    - limit (int): Page size. Defaults to DEFAULT_PAGE_SIZE when only ``after_id`` is given.
+    - after_id (int): Cursor from a previous page; only todos after that id are returned. Only valid when sorting by
+      id.
+    - after (str): Cursor from a previous page sorted by ``title`` or ``completed``, in place of ``after_id``.
+    - fields (str): Comma-separated todo fields to return; ``id`` and the ``sort`` field are always included.
+    - completed (bool): Only return todos with this completion state.
+    - title_prefix (str): Only return todos whose title starts with this text (case sensitive).
+    - min_id, max_id (int): Inclusive id range.
+    - sort (str): One of SORTABLE_FIELDS, prefixed with ``-`` for descending order.
+
+    Returns:
+    - list: The todos of the page. When more todos follow, the ``X-Next-Cursor`` header carries the
+      ``after_id`` (or, for other sorts, the ``after``) for the next page. The ``ETag`` header changes whenever a listed todo does; sending it back in
+      ``If-None-Match`` yields an empty 304 while the page is unchanged.
+
+    Raises:
+    - HTTPException: 400 for unknown fields, an unsupported sort or a cursor that does not fit the sort, 404 when
+      nothing matches.
+    """
+    projected_fields = parse_fields(fields)
+    query = build_filter_query(completed, title_prefix, min_id, max_id)
+    order = parse_sort(sort)
+    if after_id is not None and order is not None and order[0] != "id":
+        raise HTTPException(status_code=400, detail="Error! after_id cursors are only valid when sorting by id")
+    if after is not None and (order is None or order[0] == "id"):
+        raise HTTPException(status_code=400, detail="Error! after cursors are only valid when sorting by title or "
+                                                    "completed")
+    sort_cursor = None if after is None else decode_sort_cursor(after, order[0])
+    if projected_fields is not None and order is not None and order[0] not in projected_fields:
+        # The next page's cursor is built from the sort field of the last row
+        projected_fields = projected_fields + [order[0]]
+    headers = {}
     try:
-        results = todo_services.get_all_todos()
+        if query or order is not None:
+            results, next_cursor = await query_todos(query, order or ("id", 1), limit, after_id, sort_cursor,
+                                                     projected_fields)
+            if isinstance(results, dict) and results.get("error") is not None:
+                raise HTTPException(status_code=400, detail=results.get("error"))
+            if next_cursor is not None:
+                headers["X-Next-Cursor"] = str(next_cursor)
+        elif limit is None and after_id is None:
+            results = await todo_services.get_all_todos(projected_fields)
+        else:
+            page = await todo_services.get_todos_page(limit or DEFAULT_PAGE_SIZE, after_id, projected_fields)
+            if page.get("error") is not None:
+                raise HTTPException(status_code=400, detail=page.get("error"))
+            results = page["todos"]
+            if page["next_cursor"] is not None:
+                headers["X-Next-Cursor"] = str(page["next_cursor"])
         if not results:
             raise HTTPException(status_code=404, detail="No todos found")
         if any(isinstance(result, dict) and result.get("error") for result in results):
             error_messages = ", ".join(result.get("error") for result in results)
             raise HTTPException(status_code=400, detail=error_messages)
-        return results
+
+        etag = list_etag(results, projected_fields)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        headers["ETag"] = etag
+        # The rows were validated once when they were loaded; dumping them straight to JSON bytes skips FastAPI's
+        # second validation and encoding pass against response_model.
+        return Response(content=todo_list_adapter_for(projected_fields).dump_json(results),
+                        media_type="application/json", headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def validate_update_fields(body_data: dict):
+    if "id" in body_data and not isinstance(body_data.get("id"), int):
+        raise HTTPException(status_code=400, detail="Error! 'id' parameter is not a integer value instance")
+    if "title" in body_data and not isinstance(body_data.get("title"), str):
+        raise HTTPException(status_code=400, detail="Error! 'title' parameter is not a string value instance")
+    if "description" in body_data and not isinstance(body_data.get("description"), str):
+        raise HTTPException(status_code=400, detail="Error! 'description' parameter is not a string value instance")
+    if "completed" in body_data and not isinstance(body_data.get("completed"), bool):
+        raise HTTPException(status_code=400, detail="Error! 'completed' parameter is not a boolean value instance")
+
+
+@router.patch("/bulk", response_model=Dict[str, Any])
+async def update_todos_bulk_route(operations: List[ToDoBulkUpdateModel]) -> Dict[str, Any]:
+    """
+    Apply many partial updates with a single unordered bulk_write.
+
+    Parameters:
+    - operations (list): Items of the form ``{"id": <todo id>, "fields": {<field>: <new value>}}``.
+
+    Returns:
+    - dict: The aggregated matched and modified counts. When some updates fail (e.g. an ``id`` change that collides
+      with an existing todo) the others are still applied and ``failed`` lists the index and error of each failure.
+    """
+    for operation in operations:
+        validate_update_fields(operation.fields)
+
+    result = await todo_services.update_todos_bulk([(operation.id, operation.fields) for operation in operations])
+    if result.get("error") is not None:
+        raise HTTPException(status_code=400, detail=result.get("error"))
+    return result
+
+
+@router.delete("/bulk", response_model=Dict[str, Any])
+async def delete_todos_bulk_route(ids: List[int]) -> Dict[str, Any]:
+    """
+    Delete every todo whose id is listed with a single delete_many on the id index.
+
+    Returns:
+    - dict: The number of deleted todos.
+    """
+    result = await todo_services.delete_todos_bulk(ids)
+    if result.get("error") is not None:
+        raise HTTPException(status_code=400, detail=result.get("error"))
+    return result
+
+
 @router.put("/{input_data}", response_model=Dict[str, Any])
-async def update_todo_route_by_id(input_data: int, body_data: dict) -> Dict[str, Any]:
+async def update_todo_route_by_id(input_data: int, body_data: dict, response: Response,
+                                  if_match: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """
+    Update a todo. With an ``If-Match`` ETag from a previous read the update only applies while the todo is still at
+    that version; otherwise 412 is returned and nothing is written. ``If-Match: *`` only requires the todo to exist.
+    """
+    expected_version = None
+    # RFC 9110: "*" matches any current representation, so it only fails when the todo does not exist
+    must_exist = if_match is not None and if_match.strip() == "*"
+    if if_match is not None and not must_exist:
+        expected_version = version_from_etag(if_match.strip())
+        if expected_version is None:
+            raise HTTPException(status_code=412, detail="Error! 'If-Match' is not a todo ETag")
+
     try:
-        if "id" in body_data and not isinstance(body_data.get("id"), int):
-            raise HTTPException(status_code=400, detail="Error! 'id' parameter is not a integer value instance")
-        if "title" in body_data and not isinstance(body_data.get("title"), str):
-            raise HTTPException(status_code=400, detail="Error! 'title' parameter is not a string value instance")
-        if "description" in body_data and not isinstance(body_data.get("description"), str):
-            raise HTTPException(status_code=400, detail="Error! 'description' parameter is not a string value instance")
-        if "completed" in body_data and not isinstance(body_data.get("completed"), bool):
-            raise HTTPException(status_code=400, detail="Error! 'completed' parameter is not a boolean value instance")
-
-        result = todo_services.update_todo_by_id(input_data, body_data)
-        if isinstance(result, dict) and result.get("error") is not None:
-            raise HTTPException(status_code=400, detail=result.get("error"))
-        return result
+        validate_update_fields(body_data)
 
+        result = await todo_services.update_todo_by_id(input_data, body_data, expected_version, must_exist)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    if isinstance(result, dict) and result.get("precondition_failed"):
+        raise HTTPException(status_code=412, detail=result.get("error"))
+    if isinstance(result, dict) and result.get("error") is not None:
+        raise HTTPException(status_code=400, detail=result.get("error"))
+    if expected_version is not None:
+        # The conditional update bumped exactly this version, so the new ETag is known without reading it back
+        response.headers["ETag"] = document_etag({"id": body_data.get("id", input_data),
+                                                  "version": expected_version + 1})
+    return result
+
 
 @router.delete("/{input_data}", response_model=Dict[str, Any])
 async def delete_todo_route_by_id(input_data: Union[int, str]) -> Dict[str, Any]:
@@ -99,20 +433,12 @@ async def delete_todo_route_by_id(input_data: Union[int, str]) -> Dict[str, Any]
     except ValueError:
         raise HTTPException(status_code=400, detail="Error! 'id' parameter is not an integer value instance")
 
-    todos = todo_services.get_all_todos()
-
-    # Find the index of the todo item with the provided ID
-    index_to_delete = None
-    for i, todo in enumerate(todos):
-        if todo.id == input_id:
-            index_to_delete = i
-            break
-
-    if index_to_delete is None:
+    deleted_todo = await todo_services.delete_and_return_todo_by_id(input_id)
+    if deleted_todo.get("not_found"):
         raise HTTPException(status_code=404, detail=f"Todo with ID {input_id} not found.")
-
-    # Delete the todo item
-    deleted_todo = todos.pop(index_to_delete)
+    if deleted_todo.get("error") is not None:
+        raise HTTPException(status_code=500, detail=deleted_todo.get("error"))
+    deleted_todo = strip_internal_fields(deleted_todo)
 
     return {"message": f"Todo with ID {input_id} deleted successfully.", "deleted_todo": deleted_todo}
 
@@ -120,7 +446,7 @@ async def delete_todo_route_by_id(input_data: Union[int, str]) -> Dict[str, Any]
 @router.delete("/", response_model=Dict[str, Any])
 async def delete_todo_route_all() -> Dict[str, Any]:
     try:
-        result = todo_services.delete_all_todos()
+        result = await todo_services.delete_all_todos()
         if isinstance(result, dict) and result.get("error") is not None:
             raise HTTPException(status_code=400, detail=result.get("error"))
         return result
@@ -0,0 +1,212 @@
+from typing import List, Tuple
+from pymongo.errors import BulkWriteError
+
+from utils.async_db_store import AsyncToDoDBStore
+from models.todo_model import ToDoModel, materialize_todos
+from services.base_todo_services import BaseToDoServices, DB_NAME, COLLECTION_NAME
+from utils.cache import TTLCache
+from utils.event_bus import EventBus
+from utils.logger import get_logger
+from utils.responses import dumps
+from utils.single_flight import SingleFlight
+from utils.write_batcher import WriteBatcher, write_batcher_from_settings
+
+logger = get_logger(__name__)
+
+
+class AsyncToDoServices(BaseToDoServices):
+    def __init__(self, db: AsyncToDoDBStore | None = None, cache: TTLCache | None = None,
+                 stats_cache: TTLCache | None = None, events: EventBus | None = None,
+                 write_batcher: WriteBatcher | None = None, single_flight: SingleFlight | None = None):
+        super().__init__(cache, stats_cache, events, single_flight)
+        self.db = db or AsyncToDoDBStore()
+        self.write_batcher = write_batcher if write_batcher is not None else write_batcher_from_settings(
+            self._insert_batch)
+
+    async def _coalesced(self, key: tuple, call):
+        if self.single_flight is None:
+            return await call()
+        return await self.single_flight.do_async(key, call)
+
+    async def _insert_batch(self, documents: List[dict]):
+        return await self.db.add_documents(DB_NAME, COLLECTION_NAME, documents)
+
+    async def add_todo(self, todo_model: ToDoModel):
+        try:
+            document = todo_model.dict()
+            if self.write_batcher is not None:
+                await self.write_batcher.submit(document)
+            else:
+                await self.db.add_document(DB_NAME, COLLECTION_NAME, document)
+            self._invalidate_cache([])
+            self._publish("created", document["id"], document)
+            logger.info("ToDo successfully added", extra={"oid": document["_id"]})
+            return {"oid": document["_id"]}
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def add_todos(self, todo_models: List[ToDoModel]):
+        try:
+            documents = [todo_model.dict() for todo_model in todo_models]
+            try:
+                await self.db.add_documents(DB_NAME, COLLECTION_NAME, documents)
+                failed = {}
+            except BulkWriteError as e:
+                failed = {error["index"]: error["errmsg"] for error in e.details.get("writeErrors", [])}
+            return self._inserted(documents, failed)
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def get_todo_by_id(self, todo_id: int, fields: List[str] | None = None):
+        try:
+            key = ("todo", todo_id, self._fields_key(fields))
+            cached = self._cached(key)
+            if cached is not TTLCache.MISSING:
+                return dict(cached)
+
+            generation = self._write_generation
+            todo = await self._coalesced(
+                key, lambda: self.db.get_document_by_id(DB_NAME, COLLECTION_NAME, todo_id, fields))
+            if todo is None:
+                return self._not_found(todo_id)
+            self._store_cached(key, dict(todo), generation)
+            # Callers that shared the read each get their own copy
+            return dict(todo)
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def get_todo_by_query(self, todo_query: dict, fields: List[str] | None = None,
+                                sort: List[Tuple[str, int]] | None = None, limit: int = 0):
+        try:
+            todos = await self.db.get_document_by_query(DB_NAME, COLLECTION_NAME, todo_query, fields, sort, limit)
+            result = materialize_todos(todos, fields)
+            logger.debug("Todos successfully retrieved", extra={"count": len(result)})
+            return result
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def get_all_todos(self, fields: List[str] | None = None):
+        try:
+            async def load():
+                todos = await self.db.get_all_documents(DB_NAME, COLLECTION_NAME, fields)
+                return materialize_todos(todos, fields)
+
+            results = list(await self._coalesced(("all", self._fields_key(fields)), load))
+            logger.debug("All Todos successfully retrieved", extra={"count": len(results)})
+            return results
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def get_todos_page(self, limit: int, after_id: int | None = None, fields: List[str] | None = None):
+        try:
+            key = ("page", limit, self._fields_key(fields))
+            if after_id is None:
+                cached = self._cached(key)
+                if cached is not TTLCache.MISSING:
+                    return dict(cached)
+
+            generation = self._write_generation
+
+            async def load():
+                # One extra row tells whether another page exists without a separate count query
+                todos = await self.db.get_documents_page(DB_NAME, COLLECTION_NAME, limit + 1, after_id, fields)
+                return self._page(todos, limit, fields)
+
+            if after_id is not None:
+                return await load()
+            page = await self._coalesced(key, load)
+            self._store_cached(key, dict(page), generation)
+            return dict(page)
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def export_todos(self, batch_size: int):
+        async for todos in self.db.iter_document_batches(DB_NAME, COLLECTION_NAME, {}, batch_size):
+            lines = []
+            for todo in todos:
+                todo.pop("_id", None)
+                todo.pop("version", None)
+                lines.append(dumps(todo))
+            yield b"\n".join(lines) + b"\n"
+
+    async def search_todos(self, text: str, limit: int, offset: int = 0, fields: List[str] | None = None):
+        try:
+            # One extra row tells whether another page exists without a separate count query
+            todos = await self.db.search_documents(DB_NAME, COLLECTION_NAME, text, limit + 1, offset, fields)
+            return self._search_page(todos, limit, offset, fields)
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def get_stats(self, bucket_size: int):
+        try:
+            cached = self._cached_stats(bucket_size)
+            if cached is not TTLCache.MISSING:
+                return dict(cached)
+            facets = (await self.db.aggregate(DB_NAME, COLLECTION_NAME, self.stats_pipeline(bucket_size)))[0]
+            return self._stats(facets, bucket_size)
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def update_todo_by_id(self, todo_id: int, todo_dict: dict, expected_version: int | None = None,
+                                must_exist: bool = False):
+        try:
+            todo = await self.db.update_document_by_id(DB_NAME, COLLECTION_NAME, todo_id, todo_dict,
+                                                       expected_version)
+            return self._updated(todo, todo_id, todo_dict, expected_version, must_exist)
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def update_todos_bulk(self, updates: List[Tuple[int, dict]]):
+        if not updates:
+            return {"matched": 0, "modified": 0}
+        try:
+            todos = await self.db.update_documents_by_id(DB_NAME, COLLECTION_NAME, updates)
+            return self._bulk_updated(updates, todos.matched_count, todos.modified_count)
+        except BulkWriteError as e:
+            return self._bulk_updated(updates, e.details.get("nMatched", 0), e.details.get("nModified", 0),
+                                      e.details.get("writeErrors", []))
+        except Exception as e:
+            # Some of the updates may have been applied before the failure
+            self._invalidate_cache(self._bulk_update_ids(updates))
+            return {"error": str(e)}
+
+    async def delete_todos_bulk(self, todo_ids: List[int]):
+        try:
+            todos = await self.db.delete_documents_by_id(DB_NAME, COLLECTION_NAME, todo_ids)
+            return self._bulk_deleted(todos, todo_ids)
+        except Exception as e:
+            return {"error": str(e)}
+
+    async def delete_todo_by_id(self, todo_id: int):
+        try:
+            todo = await self.db.delete_document_by_id(DB_NAME, COLLECTION_NAME, todo_id)
+            return self._deleted(todo, todo_id)
+        except Exception as e:
+            return {"error": f"{e}"}
+
+    async def delete_and_return_todo_by_id(self, todo_id: int):
+        try:
+            todo = await self.db.delete_and_return_document_by_id(DB_NAME, COLLECTION_NAME, todo_id)
+            return self._deleted_and_returned(todo, todo_id)
+        except Exception as e:
+            return {"error": f"{e}"}
+
+    async def delete_all_todos(self):
+        try:
+            todos = await self.db.delete_all_documents(DB_NAME, COLLECTION_NAME, {})
+            return self._cleared(todos)
+        except Exception as e:
+            return {"error": f"{e}"}
+
+    async def ensure_indexes(self):
+        try:
+            indexes = await self.db.ensure_indexes(DB_NAME, COLLECTION_NAME)
+            return {"result": f"Indexes ensured: {', '.join(indexes)}"}
+        except Exception as e:
+            return {"error": f"{e}"}
+
+    async def check_indexes(self):
+        try:
+            return await self.db.check_indexes(DB_NAME, COLLECTION_NAME)
+        except Exception as e:
+            return {"error": f"{e}"}
@@ -0,0 +1,201 @@
+import threading
+
+from typing import Any, Dict, List, Tuple
+
+from models.todo_model import materialize_todos
+from utils.cache import TTLCache, cache_from_settings, stats_cache_from_settings
+from utils.config import settings
+from utils.event_bus import EventBus, event_bus
+from utils.single_flight import SingleFlight, single_flight_from_settings
+
+DB_NAME = "todo_list_db"
+COLLECTION_NAME = "todo_list_collection"
+
+
+class BaseToDoServices:
+    """
+    Everything ToDoServices and AsyncToDoServices share apart from the storage calls themselves: caching, change
+    events, read coalescing keys and turning storage results into service results.
+
+    The subclasses only perform the (blocking or awaited) storage call and hand its result to the helpers here.
+    """
+
+    def __init__(self, cache: TTLCache | None = None, stats_cache: TTLCache | None = None,
+                 events: EventBus | None = None, single_flight: SingleFlight | None = None):
+        self.cache = cache if cache is not None else cache_from_settings()
+        # Stats are only ever expired by their (short) TTL, never invalidated by writes
+        self.stats_cache = stats_cache if stats_cache is not None else stats_cache_from_settings()
+        # With a change stream feeding the bus, every write already arrives through Mongo
+        self.events = events if events is not None else event_bus if settings.event_source == "local" else None
+        self.single_flight = single_flight if single_flight is not None else single_flight_from_settings()
+        # Bumped by every write, so a read that started before a write does not refill the cache with what it saw
+        self._write_generation = 0
+        self._generation_lock = threading.Lock()
+
+    def _cached(self, key: tuple):
+        if self.cache is None:
+            return TTLCache.MISSING
+        return self.cache.get(key)
+
+    def _store_cached(self, key: tuple, value, generation: int):
+        if self.cache is None:
+            return
+        with self._generation_lock:
+            if generation == self._write_generation:
+                self.cache.set(key, value)
+
+    def _publish(self, event_type: str, todo_id: int | None = None, document: dict | None = None):
+        if self.events is not None:
+            data = None if document is None else \
+                {key: value for key, value in document.items() if key not in ("_id", "version")}
+            self.events.publish(event_type, todo_id, data)
+
+    def _publish_bulk(self, operation: str, todo_ids: List[int], count: int):
+        # Some of ``todo_ids`` changed but the store cannot say which, so listeners are told to refetch them
+        if self.events is not None:
+            self.events.publish("bulk", None, {"operation": operation, "ids": sorted(set(todo_ids)), "count": count})
+
+    @staticmethod
+    def _fields_key(fields: List[str] | None) -> tuple | None:
+        # The projection only depends on the set of fields, so their order and repeats must not split a key
+        return tuple(sorted(set(fields))) if fields is not None else None
+
+    def _invalidate_cache(self, todo_ids: list | None = None):
+        # Any write can change the first page; point reads only go stale for the ids written. None drops everything.
+        written_ids = set(todo_ids) if todo_ids is not None else None
+        with self._generation_lock:
+            self._write_generation += 1
+        if self.single_flight is not None:
+            # A read already in flight may have started before this write, so later callers must not join it
+            self.single_flight.forget(None if written_ids is None else
+                                      lambda key: key[0] != "todo" or key[1] in written_ids)
+        if self.cache is None:
+            return
+        if written_ids is None:
+            self.cache.clear()
+            return
+        self.cache.invalidate(lambda key: key[0] == "page" or key[1] in written_ids)
+
+    @staticmethod
+    def _not_found(todo_id: int) -> Dict[str, Any]:
+        # ``not_found`` tells a missing todo apart from a storage failure, which only carries ``error``
+        return {"error": f"Document with id {todo_id} not found.", "not_found": True}
+
+    def _inserted(self, documents: List[dict], failed: Dict[int, str]) -> Dict[str, Any]:
+        self._invalidate_cache([])
+        results = []
+        for index, document in enumerate(documents):
+            if index in failed:
+                results.append({"index": index, "error": failed[index]})
+            else:
+                results.append({"index": index, "id": document["id"], "oid": document["_id"]})
+                self._publish("created", document["id"], document)
+        return {"inserted": len(documents) - len(failed), "failed": len(failed), "results": results}
+
+    @staticmethod
+    def _page(todos: list, limit: int, fields: List[str] | None) -> Dict[str, Any]:
+        # ``todos`` holds one row more than the page when another page follows
+        results = materialize_todos(todos[:limit], fields)
+        return {"todos": results, "next_cursor": results[-1].id if len(todos) > limit else None}
+
+    @staticmethod
+    def _search_page(todos: list, limit: int, offset: int, fields: List[str] | None) -> Dict[str, Any]:
+        results = materialize_todos(todos[:limit], fields)
+        return {"todos": results, "next_offset": offset + limit if len(todos) > limit else None}
+
+    @staticmethod
+    def stats_pipeline(bucket_size: int) -> List[dict]:
+        return [{"$facet": {
+            "by_completed": [{"$group": {"_id": "$completed", "count": {"$sum": 1}}}],
+            "by_id_range": [
+                {"$group": {"_id": {"$subtract": ["$id", {"$mod": ["$id", bucket_size]}]}, "count": {"$sum": 1}}},
+                {"$sort": {"_id": 1}},
+                # $facet returns a single document, so a tiny bucket size over a wide id range must not outgrow it;
+                # the extra bucket only tells whether any were cut off
+                {"$limit": settings.stats_max_buckets + 1}
+            ]
+        }}]
+
+    def _cached_stats(self, bucket_size: int):
+        if self.stats_cache is None:
+            return TTLCache.MISSING
+        return self.stats_cache.get(("stats", bucket_size))
+
+    def _stats(self, facets: dict, bucket_size: int) -> Dict[str, Any]:
+        by_completed = {group["_id"]: group["count"] for group in facets["by_completed"]}
+        by_id_range = facets["by_id_range"]
+        stats = {
+            "total": sum(by_completed.values()),
+            "completed": by_completed.get(True, 0),
+            "open": by_completed.get(False, 0),
+            "by_id_range": [
+                {"from": group["_id"], "to": group["_id"] + bucket_size - 1, "count": group["count"]}
+                for group in by_id_range[:settings.stats_max_buckets]
+            ],
+            "truncated": len(by_id_range) > settings.stats_max_buckets
+        }
+        if self.stats_cache is not None:
+            self.stats_cache.set(("stats", bucket_size), stats)
+        return stats
+
+    def _updated(self, todo, todo_id: int, todo_dict: dict, expected_version: int | None,
+                 must_exist: bool = False) -> Dict[str, Any]:
+        self._invalidate_cache([todo_id, todo_dict.get("id")])
+        # ``precondition_failed`` tells a refused conditional update apart from a storage failure
+        if expected_version is not None and todo.matched_count == 0:
+            return {"error": f"Document with id {todo_id} is not at version {expected_version}.",
+                    "precondition_failed": True}
+        if must_exist and todo.matched_count == 0:
+            return {**self._not_found(todo_id), "precondition_failed": True}
+        if todo.modified_count:
+            self._publish("updated", todo_dict.get("id", todo_id), todo_dict)
+        return {"result": f"Documents updated: {todo.modified_count}"}
+
+    @staticmethod
+    def _bulk_update_ids(updates: List[Tuple[int, dict]]) -> list:
+        return [todo_id for todo_id, _ in updates] + [fields.get("id") for _, fields in updates]
+
+    def _bulk_updated(self, updates: List[Tuple[int, dict]], matched: int, modified: int,
+                      write_errors: List[dict] = ()) -> Dict[str, Any]:
+        # Called for partial failures too, since an unordered bulk_write still applies every other update
+        self._invalidate_cache(self._bulk_update_ids(updates))
+        failed = {error["index"] for error in write_errors}
+        applied = [update for index, update in enumerate(updates) if index not in failed]
+        # The bulk result only has totals, so per-todo events are only certain when every applied update modified
+        if modified == len(applied):
+            for todo_id, fields in applied:
+                self._publish("updated", fields.get("id", todo_id), fields)
+        elif modified:
+            self._publish_bulk("update", [todo_id for todo_id, _ in applied], modified)
+        result = {"matched": matched, "modified": modified}
+        if write_errors:
+            result["failed"] = [{"index": error["index"], "error": error["errmsg"]} for error in write_errors]
+        return result
+
+    def _bulk_deleted(self, todos, todo_ids: List[int]) -> Dict[str, Any]:
+        self._invalidate_cache(todo_ids)
+        requested = list(dict.fromkeys(todo_ids))
+        if todos.deleted_count == len(requested):
+            for todo_id in requested:
+                self._publish("deleted", todo_id)
+        elif todos.deleted_count:
+            self._publish_bulk("delete", todo_ids, todos.deleted_count)
+        return {"deleted": todos.deleted_count}
+
+    def _deleted(self, todo, todo_id: int) -> Dict[str, Any]:
+        self._invalidate_cache([todo_id])
+        if todo.deleted_count:
+            self._publish("deleted", todo_id)
+        return {"result": f"Documents deleted: {todo.deleted_count}"}
+
+    def _deleted_and_returned(self, todo: dict | None, todo_id: int) -> dict:
+        self._invalidate_cache([todo_id])
+        if todo is None:
+            return self._not_found(todo_id)
+        self._publish("deleted", todo_id, todo)
+        return todo
+
+    def _cleared(self, todos) -> Dict[str, Any]:
+        self._invalidate_cache()
+        self._publish("cleared")
+        return {"result": f"Document deleted: {todos.deleted_count}"}
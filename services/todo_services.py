@@ -1,67 +1,190 @@
-from utils.db_store import ToDoDBStore
-from models.todo_model import ToDoModel
+from typing import List, Tuple
+from pymongo.errors import BulkWriteError
 
+from utils.storage import ToDoStorage, create_store
+from models.todo_model import ToDoModel, materialize_todos
+from services.base_todo_services import BaseToDoServices, DB_NAME, COLLECTION_NAME
+from utils.cache import TTLCache
+from utils.event_bus import EventBus
+from utils.logger import get_logger
+from utils.single_flight import SingleFlight
 
-class ToDoServices:
-    def __init__(self):
-        self.db = ToDoDBStore()
+logger = get_logger(__name__)
+
+
+class ToDoServices(BaseToDoServices):
+    def __init__(self, db: ToDoStorage | None = None, cache: TTLCache | None = None,
+                 stats_cache: TTLCache | None = None, events: EventBus | None = None,
+                 single_flight: SingleFlight | None = None):
+        super().__init__(cache, stats_cache, events, single_flight)
+        self.db = db or create_store()
+
+    def _coalesced(self, key: tuple, call):
+        if self.single_flight is None:
+            return call()
+        return self.single_flight.do(key, call)
 
     def add_todo(self, todo_model: ToDoModel):
         try:
-            todo = self.db.add_document("todo_list_db", "todo_list_collection", todo_model.dict())
-            print(f"ToDo successfully added: {todo.inserted_id}")
+            document = todo_model.dict()
+            todo = self.db.add_document(DB_NAME, COLLECTION_NAME, document)
+            self._invalidate_cache([])
+            self._publish("created", document["id"], document)
+            logger.info("ToDo successfully added", extra={"oid": todo.inserted_id})
             return {"oid": todo.inserted_id}
         except Exception as e:
             return {"error": str(e)}
 
-    def get_todo_by_id(self, todo_id: int):
+    def add_todos(self, todo_models: List[ToDoModel]):
         try:
-            todo = self.db.get_document_by_id("todo_list_db", "todo_list_collection", todo_id)
+            documents = [todo_model.dict() for todo_model in todo_models]
+            try:
+                self.db.add_documents(DB_NAME, COLLECTION_NAME, documents)
+                failed = {}
+            except BulkWriteError as e:
+                failed = {error["index"]: error["errmsg"] for error in e.details.get("writeErrors", [])}
+            return self._inserted(documents, failed)
+        except Exception as e:
+            return {"error": str(e)}
+
+    def get_todo_by_id(self, todo_id: int, fields: List[str] | None = None):
+        try:
+            key = ("todo", todo_id, self._fields_key(fields))
+            cached = self._cached(key)
+            if cached is not TTLCache.MISSING:
+                return dict(cached)
+
+            generation = self._write_generation
+            todo = self._coalesced(key, lambda: self.db.get_document_by_id(DB_NAME, COLLECTION_NAME, todo_id, fields))
             if todo is None:
-                raise ValueError(f"Document with id {todo_id} not found.")
-            return todo
+                return self._not_found(todo_id)
+            self._store_cached(key, dict(todo), generation)
+            # Callers that shared the read each get their own copy
+            return dict(todo)
         except Exception as e:
             return {"error": str(e)}
 
-    def get_todo_by_query(self, todo_query: dict):
+    def get_todo_by_query(self, todo_query: dict, fields: List[str] | None = None,
+                          sort: List[Tuple[str, int]] | None = None, limit: int = 0):
         try:
-            todos = self.db.get_document_by_query("todo_list_db", "todo_list_collection", todo_query)
-            result = []
-            for todo in todos:
-                result.append(ToDoModel(**todo))
-            print(f"All Todos successfully retrieved: {result}")
+            todos = self.db.get_document_by_query(DB_NAME, COLLECTION_NAME, todo_query, fields, sort, limit)
+            result = materialize_todos(todos, fields)
+            logger.debug("Todos successfully retrieved", extra={"count": len(result)})
             return result
         except Exception as e:
             return {"error": str(e)}
 
-    def get_all_todos(self):
+    def get_all_todos(self, fields: List[str] | None = None):
         try:
-            todos = self.db.get_all_documents("todo_list_db", "todo_list_collection")
-            results = []
-            for todo in todos:
-                results.append(ToDoModel(**todo))
-            print(f"All Todos successfully retrieved: {todos}")
+            def load():
+                return materialize_todos(self.db.get_all_documents(DB_NAME, COLLECTION_NAME, fields), fields)
+
+            results = list(self._coalesced(("all", self._fields_key(fields)), load))
+            logger.debug("All Todos successfully retrieved", extra={"count": len(results)})
             return results
         except Exception as e:
             return {"error": str(e)}
 
-    def update_todo_by_id(self, todo_id: int, todo_dict: dict):
+    def get_todos_page(self, limit: int, after_id: int | None = None, fields: List[str] | None = None):
+        try:
+            key = ("page", limit, self._fields_key(fields))
+            if after_id is None:
+                cached = self._cached(key)
+                if cached is not TTLCache.MISSING:
+                    return dict(cached)
+
+            generation = self._write_generation
+
+            def load():
+                # One extra row tells whether another page exists without a separate count query
+                todos = self.db.get_documents_page(DB_NAME, COLLECTION_NAME, limit + 1, after_id, fields)
+                return self._page(todos, limit, fields)
+
+            if after_id is not None:
+                return load()
+            page = self._coalesced(key, load)
+            self._store_cached(key, dict(page), generation)
+            return dict(page)
+        except Exception as e:
+            return {"error": str(e)}
+
+    def search_todos(self, text: str, limit: int, offset: int = 0, fields: List[str] | None = None):
+        try:
+            # One extra row tells whether another page exists without a separate count query
+            todos = self.db.search_documents(DB_NAME, COLLECTION_NAME, text, limit + 1, offset, fields)
+            return self._search_page(todos, limit, offset, fields)
+        except Exception as e:
+            return {"error": str(e)}
+
+    def get_stats(self, bucket_size: int):
+        try:
+            cached = self._cached_stats(bucket_size)
+            if cached is not TTLCache.MISSING:
+                return dict(cached)
+            facets = self.db.aggregate(DB_NAME, COLLECTION_NAME, self.stats_pipeline(bucket_size))[0]
+            return self._stats(facets, bucket_size)
+        except Exception as e:
+            return {"error": str(e)}
+
+    def update_todo_by_id(self, todo_id: int, todo_dict: dict, expected_version: int | None = None,
+                          must_exist: bool = False):
+        try:
+            todo = self.db.update_document_by_id(DB_NAME, COLLECTION_NAME, todo_id, todo_dict, expected_version)
+            return self._updated(todo, todo_id, todo_dict, expected_version, must_exist)
+        except Exception as e:
+            return {"error": str(e)}
+
+    def update_todos_bulk(self, updates: List[Tuple[int, dict]]):
+        if not updates:
+            return {"matched": 0, "modified": 0}
         try:
-            todo = self.db.update_document_by_id("todo_list_db", "todo_list_collection", todo_id, todo_dict)
-            return {"result": f"Documents updated: {todo.modified_count}"}
+            todos = self.db.update_documents_by_id(DB_NAME, COLLECTION_NAME, updates)
+            return self._bulk_updated(updates, todos.matched_count, todos.modified_count)
+        except BulkWriteError as e:
+            return self._bulk_updated(updates, e.details.get("nMatched", 0), e.details.get("nModified", 0),
+                                      e.details.get("writeErrors", []))
+        except Exception as e:
+            # Some of the updates may have been applied before the failure
+            self._invalidate_cache(self._bulk_update_ids(updates))
+            return {"error": str(e)}
+
+    def delete_todos_bulk(self, todo_ids: List[int]):
+        try:
+            todos = self.db.delete_documents_by_id(DB_NAME, COLLECTION_NAME, todo_ids)
+            return self._bulk_deleted(todos, todo_ids)
         except Exception as e:
             return {"error": str(e)}
 
     def delete_todo_by_id(self, todo_id: int):
         try:
-            todo = self.db.delete_document_by_id("todo_list_db", "todo_list_collection", todo_id)
-            return {"result": f"Documents deleted: {todo.deleted_count}"}
+            todo = self.db.delete_document_by_id(DB_NAME, COLLECTION_NAME, todo_id)
+            return self._deleted(todo, todo_id)
+        except Exception as e:
+            return {"error": f"{e}"}
+
+    def delete_and_return_todo_by_id(self, todo_id: int):
+        try:
+            todo = self.db.delete_and_return_document_by_id(DB_NAME, COLLECTION_NAME, todo_id)
+            return self._deleted_and_returned(todo, todo_id)
         except Exception as e:
             return {"error": f"{e}"}
 
     def delete_all_todos(self):
         try:
-            todos = self.db.delete_all_documents("todo_list_db", "todo_list_collection", {})
-            return {"result": f"Document deleted: {todos.deleted_count}"}
+            todos = self.db.delete_all_documents(DB_NAME, COLLECTION_NAME, {})
+            return self._cleared(todos)
+        except Exception as e:
+            return {"error": f"{e}"}
+
+    def ensure_indexes(self):
+        try:
+            indexes = self.db.ensure_indexes(DB_NAME, COLLECTION_NAME)
+            return {"result": f"Indexes ensured: {', '.join(indexes)}"}
+        except Exception as e:
+            return {"error": f"{e}"}
+
+    def check_indexes(self):
+        try:
+            return self.db.check_indexes(DB_NAME, COLLECTION_NAME)
         except Exception as e:
             return {"error": f"{e}"}
@@ -0,0 +1,140 @@
+import asyncio
+import pytest
+
+from services.async_todo_services import AsyncToDoServices
+from models.todo_model import ToDoModel
+from utils.cache import TTLCache
+
+
+class TestAsyncToDoServices:
+    @pytest.fixture(scope="class")
+    def todo_services_test(self):
+        return AsyncToDoServices()
+
+    @pytest.fixture(scope="function")
+    def todo_model_test(self):
+        return ToDoModel(id=0, title="PytestFixtureGood", description="InstanceGood", completed=True)
+
+    def test_add_and_get_todo(self, todo_services_test, todo_model_test):
+        async def scenario():
+            await todo_services_test.delete_all_todos()
+            added = await todo_services_test.add_todo(todo_model_test)
+            retrieved = await todo_services_test.get_todo_by_id(1)
+            await todo_services_test.delete_all_todos()
+            return added, retrieved
+
+        added, retrieved = asyncio.run(scenario())
+
+        assert added.get("oid") is not None
+        assert retrieved.get("title") == todo_model_test.title
+
+    def test_concurrent_inserts(self, todo_services_test, todo_model_test):
+        async def scenario():
+            await todo_services_test.delete_all_todos()
+            await asyncio.gather(*(todo_services_test.add_todo(todo_model_test) for _ in range(20)))
+            todos = await todo_services_test.get_all_todos()
+            await todo_services_test.delete_all_todos()
+            return todos
+
+        todos = asyncio.run(scenario())
+
+        assert len(todos) == 20
+        assert len({todo.id for todo in todos}) == 20
+
+    def test_get_todo_by_id_bad(self, todo_services_test):
+        async def scenario():
+            await todo_services_test.delete_all_todos()
+            return await todo_services_test.get_todo_by_id(999)
+
+        result = asyncio.run(scenario())
+
+        assert result.get("error") is not None
+
+    def test_cached_point_read_invalidated_on_update(self, todo_model_test):
+        todo_services_test = AsyncToDoServices(cache=TTLCache(max_size=10, ttl=60))
+
+        async def scenario():
+            await todo_services_test.delete_all_todos()
+            await todo_services_test.add_todo(todo_model_test)
+            await todo_services_test.get_todo_by_id(1)
+            cached = await todo_services_test.get_todo_by_id(1)
+            await todo_services_test.update_todo_by_id(1, {"title": "PytestFixtureUpdate"})
+            updated = await todo_services_test.get_todo_by_id(1)
+            await todo_services_test.delete_all_todos()
+            return cached, updated
+
+        cached, updated = asyncio.run(scenario())
+
+        assert cached.get("title") == todo_model_test.title
+        assert updated.get("title") == "PytestFixtureUpdate"
+        assert todo_services_test.cache.hits == 1
+
+    def test_cached_point_read_invalidated_on_partial_bulk_update(self, todo_model_test):
+        todo_services_test = AsyncToDoServices(cache=TTLCache(max_size=10, ttl=60))
+
+        async def scenario():
+            await todo_services_test.ensure_indexes()
+            await todo_services_test.delete_all_todos()
+            await todo_services_test.add_todos([todo_model_test, todo_model_test])
+            await todo_services_test.get_todo_by_id(1)
+            result = await todo_services_test.update_todos_bulk([(1, {"title": "PytestFixtureUpdate"}), (2, {"id": 1})])
+            updated = await todo_services_test.get_todo_by_id(1)
+            await todo_services_test.delete_all_todos()
+            return result, updated
+
+        result, updated = asyncio.run(scenario())
+
+        assert result["modified"] == 1
+        assert [failure["index"] for failure in result["failed"]] == [1]
+        assert updated.get("title") == "PytestFixtureUpdate"
+
+    def test_read_overtaken_by_write_is_not_cached(self, todo_model_test):
+        todo_services_test = AsyncToDoServices(cache=TTLCache(max_size=10, ttl=60))
+        get_document_by_id = todo_services_test.db.get_document_by_id
+
+        async def scenario():
+            read_done, write_done = asyncio.Event(), asyncio.Event()
+
+            async def slow_get_document_by_id(*args, **kwargs):
+                # Reads the todo, then only returns once a write has been applied
+                document = await get_document_by_id(*args, **kwargs)
+                read_done.set()
+                await write_done.wait()
+                return document
+
+            await todo_services_test.delete_all_todos()
+            await todo_services_test.add_todo(todo_model_test)
+            todo_services_test.db.get_document_by_id = slow_get_document_by_id
+            stale_read = asyncio.ensure_future(todo_services_test.get_todo_by_id(1))
+            await read_done.wait()
+            await todo_services_test.update_todo_by_id(1, {"title": "PytestFixtureUpdate"})
+            write_done.set()
+            stale = await stale_read
+            todo_services_test.db.get_document_by_id = get_document_by_id
+            fresh = await todo_services_test.get_todo_by_id(1)
+            await todo_services_test.delete_all_todos()
+            return stale, fresh
+
+        stale, fresh = asyncio.run(scenario())
+
+        assert stale.get("title") == todo_model_test.title
+        assert fresh.get("title") == "PytestFixtureUpdate"
+
+    def test_stats_cached_for_ttl(self, todo_model_test):
+        todo_services_test = AsyncToDoServices(stats_cache=TTLCache(max_size=10, ttl=60))
+
+        async def scenario():
+            await todo_services_test.delete_all_todos()
+            await todo_services_test.add_todo(todo_model_test)
+            first = await todo_services_test.get_stats(1000)
+            await todo_services_test.add_todo(todo_model_test)
+            cached = await todo_services_test.get_stats(1000)
+            await todo_services_test.delete_all_todos()
+            return first, cached
+
+        first, cached = asyncio.run(scenario())
+
+        assert first == {"total": 1, "completed": 1, "open": 0, "by_id_range": [{"from": 0, "to": 999, "count": 1}],
+                         "truncated": False}
+        assert cached == first
+        assert todo_services_test.stats_cache.hits == 1
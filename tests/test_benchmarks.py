@@ -0,0 +1,33 @@
+from benchmarks.run_benchmarks import check_scaling, compare, percentile
+
+
+def entry(operation, size, p50_ms, layer="store"):
+    return {"layer": layer, "operation": operation, "size": size, "p50_ms": p50_ms}
+
+
+class TestBenchmarks:
+    def test_percentile(self):
+        samples = [float(value) for value in range(1, 101)]
+
+        assert percentile(samples, 0.5) == 51.0
+        assert percentile(samples, 0.99) == 99.0
+        assert percentile([3.0], 0.99) == 3.0
+
+    def test_compare_flags_slowdowns_beyond_tolerance(self):
+        baseline = [entry("get_document_by_id", 1000, 1.0), entry("get_documents_page", 1000, 1.0)]
+        results = [entry("get_document_by_id", 1000, 1.2), entry("get_documents_page", 1000, 1.5),
+                   entry("get_document_by_id", 100000, 9.0)]
+
+        regressions = compare(results, baseline, 0.25)
+
+        assert len(regressions) == 1
+        assert "get_documents_page" in regressions[0]
+
+    def test_check_scaling_catches_linear_point_reads(self):
+        results = [entry("get_document_by_id", 1000, 0.1), entry("get_document_by_id", 1000000, 50.0),
+                   entry("get_all_documents", 1000, 1.0), entry("get_all_documents", 1000000, 900.0)]
+
+        violations = check_scaling(results, 5.0)
+
+        assert len(violations) == 1
+        assert "get_document_by_id" in violations[0]
@@ -0,0 +1,42 @@
+import time
+
+from utils.cache import TTLCache
+
+
+class TestTTLCache:
+    def test_get_and_set(self):
+        cache = TTLCache(max_size=2, ttl=60)
+
+        assert cache.get("a") is TTLCache.MISSING
+        cache.set("a", 1)
+
+        assert cache.get("a") == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_lru_eviction(self):
+        cache = TTLCache(max_size=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("b") is TTLCache.MISSING
+        assert cache.get("a") == 1
+        assert cache.stats()["evictions"] == 1
+
+    def test_ttl_expiry(self):
+        cache = TTLCache(max_size=2, ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+
+        assert cache.get("a") is TTLCache.MISSING
+
+    def test_invalidate(self):
+        cache = TTLCache(max_size=10, ttl=60)
+        cache.set(("todo", 1), "first")
+        cache.set(("todo", 2), "second")
+        cache.invalidate(lambda key: key[1] == 1)
+
+        assert cache.get(("todo", 1)) is TTLCache.MISSING
+        assert cache.get(("todo", 2)) == "second"
@@ -0,0 +1,30 @@
+from utils.config import Settings
+from utils.mongo_client import create_client
+
+
+class TestSettings:
+    def test_defaults(self, monkeypatch):
+        monkeypatch.delenv("TODO_MONGO_URI", raising=False)
+        config = Settings.from_env()
+
+        assert config.mongo_uri == "mongodb://localhost:27017"
+        assert config.mongo_max_pool_size == 100
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("TODO_MONGO_URI", "mongodb://db.internal:27018")
+        monkeypatch.setenv("TODO_MONGO_MAX_POOL_SIZE", "25")
+        monkeypatch.setenv("TODO_MONGO_WRITE_CONCERN", "majority")
+        config = Settings.from_env()
+
+        assert config.mongo_uri == "mongodb://db.internal:27018"
+        assert config.mongo_max_pool_size == 25
+        assert config.mongo_write_concern == "majority"
+
+    def test_create_client_applies_pool_settings(self):
+        config = Settings(mongo_max_pool_size=7, mongo_min_pool_size=2, mongo_write_concern="majority")
+        client = create_client(config)
+
+        assert client.options.pool_options.max_pool_size == 7
+        assert client.options.pool_options.min_pool_size == 2
+        assert client.write_concern.document == {"w": "majority"}
+        client.close()
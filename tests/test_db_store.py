@@ -1,12 +1,15 @@
 import pytest
 
 from utils.db_store import ToDoDBStore
+from utils.id_allocator import IdAllocator
+from utils.memory_store import InMemoryToDoDBStore
 
 
 class TestToDoDBStore:
-    @pytest.fixture(scope="function")
-    def mongo_driver(self):
-        todo_db = ToDoDBStore()
+    # Every engine has to honour the same store contract; engine specific behaviour is tested next to the engine
+    @pytest.fixture(scope="function", params=[ToDoDBStore, lambda: InMemoryToDoDBStore({})], ids=["mongo", "memory"])
+    def mongo_driver(self, request):
+        todo_db = request.param()
         return todo_db
 
     @pytest.fixture(scope="function")
@@ -42,6 +45,16 @@ class TestToDoDBStore:
 
         mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
 
+    def test_add_documents(self, mongo_driver, todo_document_fix):
+        mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
+
+        result = mongo_driver.add_documents("todo_list_db", "todo_list_collection", todo_document_fix)
+
+        assert len(result.inserted_ids) == len(todo_document_fix)
+        assert [document["id"] for document in todo_document_fix] == [1, 2]
+
+        mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
+
     def test_get_document_by_id(self, mongo_driver, todo_document_fix):
         # Delete all documents in the collection
         mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
@@ -109,6 +122,21 @@ class TestToDoDBStore:
 
         mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
 
+    def test_get_documents_page(self, mongo_driver, todo_document_fix):
+        mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
+
+        for document_fix in todo_document_fix:
+            mongo_driver.add_document("todo_list_db", "todo_list_collection", dict(document_fix))
+
+        first_page = mongo_driver.get_documents_page("todo_list_db", "todo_list_collection", 1)
+        second_page = mongo_driver.get_documents_page("todo_list_db", "todo_list_collection", 1,
+                                                      first_page[-1]["id"])
+
+        assert [document["id"] for document in first_page] == [1]
+        assert [document["id"] for document in second_page] == [2]
+
+        mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
+
     def test_update_document_by_id(self, mongo_driver, todo_document_fix):
         # Delete all documents in the collection
         mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
@@ -130,6 +158,23 @@ class TestToDoDBStore:
 
         mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
 
+    def test_update_document_by_id_versioned(self, mongo_driver, todo_document_fix):
+        mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
+        mongo_driver.add_document("todo_list_db", "todo_list_collection", todo_document_fix[0])
+
+        stale = mongo_driver.update_document_by_id("todo_list_db", "todo_list_collection", 1,
+                                                   {"title": "Stale"}, expected_version=2)
+        current = mongo_driver.update_document_by_id("todo_list_db", "todo_list_collection", 1,
+                                                     {"title": "Current"}, expected_version=1)
+        document = mongo_driver.get_document_by_id("todo_list_db", "todo_list_collection", 1)
+
+        assert stale.matched_count == 0
+        assert current.modified_count == 1
+        assert document["title"] == "Current"
+        assert document["version"] == 2
+
+        mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
+
     def test_delete_document_by_id(self, mongo_driver, todo_document_fix):
         # Delete all documents in the collection
         mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
@@ -145,6 +190,21 @@ class TestToDoDBStore:
 
         mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
 
+    def test_delete_and_return_document_by_id(self, mongo_driver, todo_document_fix):
+        mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
+
+        for document_fix in todo_document_fix:
+            mongo_driver.add_document("todo_list_db", "todo_list_collection", document_fix)
+
+        result = mongo_driver.delete_and_return_document_by_id("todo_list_db", "todo_list_collection", 1)
+
+        assert result is not None
+        assert result["id"] == 1
+        assert mongo_driver.get_document_by_id("todo_list_db", "todo_list_collection", 1) is None
+        assert mongo_driver.delete_and_return_document_by_id("todo_list_db", "todo_list_collection", 1) is None
+
+        mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
+
     def test_delete_all_documents(self, mongo_driver, todo_document_fix):
         # Delete all documents in the collection
         mongo_driver.delete_all_documents("todo_list_db", "todo_list_collection", {})
@@ -168,3 +228,30 @@ class TestToDoDBStore:
         # Assert the deletion operation
         assert result is not None
         assert result.deleted_count == counter
+
+    def test_add_document_ids_unique_across_allocators(self, todo_document_fix):
+        # Two stores with their own allocators stand in for two worker processes sharing the counter document
+        first_worker = ToDoDBStore(IdAllocator(block_size=3))
+        second_worker = ToDoDBStore(IdAllocator(block_size=3))
+        first_worker.delete_all_documents("todo_list_db", "todo_list_collection", {})
+
+        for _ in range(5):
+            for worker in (first_worker, second_worker):
+                worker.add_document("todo_list_db", "todo_list_collection", dict(todo_document_fix[0]))
+
+        ids = [document["id"] for document in first_worker.get_all_documents("todo_list_db", "todo_list_collection")]
+
+        assert len(ids) == 10
+        assert len(set(ids)) == len(ids)
+
+        first_worker.delete_all_documents("todo_list_db", "todo_list_collection", {})
+
+    def test_ensure_indexes(self, mongo_driver):
+        mongo_driver.ensure_indexes("todo_list_db", "todo_list_collection")
+        # Running it again must be a no-op rather than an error
+        mongo_driver.ensure_indexes("todo_list_db", "todo_list_collection")
+
+        report = mongo_driver.check_indexes("todo_list_db", "todo_list_collection")
+
+        assert report["missing"] == []
+        assert "id_unique" in report["expected"]
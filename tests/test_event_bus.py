@@ -0,0 +1,179 @@
+import asyncio
+import threading
+import orjson
+
+from models.todo_model import ToDoModel
+from services.async_todo_services import AsyncToDoServices
+from utils.event_bus import ChangeStreamFeeder, EventBus, format_sse, sse_stream
+
+
+class TestEventBus:
+    def test_publish_reaches_subscriber(self):
+        bus = EventBus()
+
+        async def scenario():
+            subscription = bus.subscribe()
+            bus.publish("created", 1, {"title": "Event"})
+            event = await subscription.get(1.0)
+            subscription.close()
+            return event
+
+        event = asyncio.run(scenario())
+
+        assert event == {"id": 1, "type": "created", "todo_id": 1, "data": {"title": "Event"}}
+        assert bus.subscriber_count == 0
+
+    def test_publish_from_another_thread(self):
+        bus = EventBus()
+
+        async def scenario():
+            subscription = bus.subscribe()
+            thread = threading.Thread(target=bus.publish, args=("deleted", 7))
+            thread.start()
+            event = await subscription.get(1.0)
+            thread.join()
+            subscription.close()
+            return event
+
+        event = asyncio.run(scenario())
+
+        assert event["type"] == "deleted"
+        assert event["todo_id"] == 7
+
+    def test_subscribe_replays_history_after_last_event_id(self):
+        bus = EventBus(history_size=10)
+        for todo_id in range(1, 4):
+            bus.publish("created", todo_id)
+
+        async def scenario():
+            subscription = bus.subscribe(last_event_id=1)
+            events = [await subscription.get(1.0), await subscription.get(1.0)]
+            subscription.close()
+            return events, subscription.overflowed
+
+        events, overflowed = asyncio.run(scenario())
+
+        assert [event["id"] for event in events] == [2, 3]
+        assert not overflowed
+
+    def test_subscribe_flags_gap_beyond_history(self):
+        bus = EventBus(history_size=2)
+        for todo_id in range(1, 6):
+            bus.publish("created", todo_id)
+
+        async def scenario():
+            subscription = bus.subscribe(last_event_id=1)
+            subscription.close()
+            return subscription.overflowed, subscription.queue.qsize()
+
+        overflowed, queued = asyncio.run(scenario())
+
+        assert overflowed
+        assert queued == 2
+
+    def test_full_queue_drops_and_resyncs(self):
+        bus = EventBus(max_queue=2)
+
+        async def scenario():
+            subscription = bus.subscribe()
+            for todo_id in range(1, 5):
+                bus.publish("updated", todo_id)
+            await asyncio.sleep(0)
+            stream = sse_stream(subscription, 1.0)
+            frames = [await stream.__anext__() for _ in range(3)]
+            await stream.aclose()
+            return frames
+
+        frames = asyncio.run(scenario())
+
+        assert frames[0] == b"event: resync\ndata: {}\n\n"
+        assert frames[1].startswith(b"id: 1\nevent: updated\n")
+        assert frames[2].startswith(b"id: 2\n")
+        assert bus.subscriber_count == 0
+
+    def test_sse_stream_sends_keep_alive(self):
+        bus = EventBus()
+
+        async def scenario():
+            stream = sse_stream(bus.subscribe(), 0.01)
+            frame = await stream.__anext__()
+            await stream.aclose()
+            return frame
+
+        assert asyncio.run(scenario()) == b": keep-alive\n\n"
+
+    def test_format_sse(self):
+        frame = format_sse({"id": 3, "type": "created", "todo_id": 5, "data": {"title": "Event"}})
+
+        header, data = frame.rstrip(b"\n").rsplit(b"\n", 1)
+        assert header == b"id: 3\nevent: created"
+        assert orjson.loads(data[len(b"data: "):]) == {"id": 3, "type": "created", "todo_id": 5,
+                                                       "data": {"title": "Event"}}
+
+    def test_change_stream_feeder_maps_changes(self):
+        bus = EventBus()
+        feeder = ChangeStreamFeeder(bus, collection=None)
+
+        feeder.publish({"operationType": "insert",
+                        "fullDocument": {"_id": "oid", "id": 4, "title": "Event", "version": 0}})
+        feeder.publish({"operationType": "delete", "documentKey": {"_id": "oid"}})
+        feeder.publish({"operationType": "invalidate"})
+
+        events = list(bus._history)
+        assert [(event["type"], event["todo_id"]) for event in events] == [("created", 4), ("deleted", None)]
+        assert events[0]["data"] == {"id": 4, "title": "Event"}
+        assert events[1]["data"] == {"oid": "oid"}
+
+    def test_services_publish_writes(self):
+        bus = EventBus()
+        todo_services_test = AsyncToDoServices(events=bus)
+        todo = ToDoModel(id=0, title="EventTodo", description="Published", completed=False)
+
+        async def scenario():
+            await todo_services_test.delete_all_todos()
+            subscription = bus.subscribe()
+            await todo_services_test.add_todo(todo)
+            await todo_services_test.update_todo_by_id(1, {"completed": True})
+            await todo_services_test.delete_todo_by_id(1)
+            await todo_services_test.delete_todo_by_id(1)
+            await todo_services_test.delete_all_todos()
+            await asyncio.sleep(0)
+            events = []
+            while not subscription.queue.empty():
+                events.append(subscription.queue.get_nowait())
+            subscription.close()
+            return events
+
+        events = asyncio.run(scenario())
+
+        assert [(event["type"], event["todo_id"]) for event in events] == [
+            ("created", 1), ("updated", 1), ("deleted", 1), ("cleared", None)]
+        assert events[0]["data"] == {"id": 1, "title": "EventTodo", "description": "Published", "completed": False}
+
+    def test_bulk_writes_publish_only_certain_changes(self):
+        bus = EventBus()
+        todo_services_test = AsyncToDoServices(events=bus)
+        todo = ToDoModel(id=0, title="EventTodo", description="Published", completed=False)
+
+        async def scenario():
+            await todo_services_test.delete_all_todos()
+            await todo_services_test.add_todos([todo, todo, todo])
+            subscription = bus.subscribe()
+            await todo_services_test.update_todos_bulk([(1, {"completed": True}), (2, {"completed": True})])
+            await todo_services_test.update_todos_bulk([(1, {"title": "Renamed"}), (999, {"title": "Renamed"})])
+            await todo_services_test.delete_todos_bulk([1, 2])
+            await todo_services_test.delete_todos_bulk([3, 999])
+            await asyncio.sleep(0)
+            events = []
+            while not subscription.queue.empty():
+                events.append(subscription.queue.get_nowait())
+            subscription.close()
+            await todo_services_test.delete_all_todos()
+            return events
+
+        events = asyncio.run(scenario())
+
+        assert [(event["type"], event["todo_id"]) for event in events] == [
+            ("updated", 1), ("updated", 2), ("bulk", None), ("deleted", 1), ("deleted", 2), ("bulk", None)]
+        assert events[2]["data"] == {"operation": "update", "ids": [1, 999], "count": 1}
+        assert events[5]["data"] == {"operation": "delete", "ids": [3, 999], "count": 1}
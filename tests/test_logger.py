@@ -0,0 +1,68 @@
+import json
+import logging
+import queue
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from utils.logger import ContextFilter, DroppingQueueHandler, JsonFormatter, RequestIdMiddleware, request_id_var
+
+
+def make_record(level=logging.INFO, message="hello %s", args=("world",), **extra):
+    record = logging.LogRecord("todo.test", level, __file__, 1, message, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+class TestLogger:
+    def test_json_formatter_includes_extra_fields(self):
+        entry = json.loads(JsonFormatter().format(make_record(count=3, request_id="abc")))
+
+        assert entry["message"] == "hello world"
+        assert entry["level"] == "INFO"
+        assert entry["count"] == 3
+        assert entry["request_id"] == "abc"
+
+    def test_sampling_only_drops_below_warning(self):
+        context_filter = ContextFilter(sample_rate=0.0)
+
+        assert context_filter.filter(make_record(logging.INFO)) is False
+        assert context_filter.filter(make_record(logging.WARNING)) is True
+
+    def test_filter_stamps_request_id(self):
+        token = request_id_var.set("req-1")
+        try:
+            record = make_record()
+            ContextFilter().filter(record)
+        finally:
+            request_id_var.reset(token)
+
+        assert record.request_id == "req-1"
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = DroppingQueueHandler(queue.Queue(1))
+
+        handler.handle(make_record())
+        handler.handle(make_record())
+
+        assert handler.queue.qsize() == 1
+        assert handler.dropped == 1
+        assert handler.queue.get_nowait().msg == "hello world"
+
+    def test_request_id_middleware_echoes_header(self):
+        app = FastAPI()
+
+        @app.get("/")
+        async def read():
+            return {"request_id": request_id_var.get()}
+
+        app.add_middleware(RequestIdMiddleware)
+        client = TestClient(app)
+
+        response = client.get("/", headers={"X-Request-ID": "given"})
+        generated = client.get("/")
+
+        assert response.json() == {"request_id": "given"}
+        assert response.headers["x-request-id"] == "given"
+        assert generated.headers["x-request-id"] == generated.json()["request_id"]
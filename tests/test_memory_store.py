@@ -0,0 +1,109 @@
+import pytest
+
+from utils.memory_store import InMemoryToDoDBStore
+
+
+class TestInMemoryToDoDBStore:
+    @pytest.fixture(scope="function")
+    def memory_store(self):
+        todo_db = InMemoryToDoDBStore({})
+        return todo_db
+
+    @pytest.fixture(scope="function")
+    def todo_document_fix(self):
+        todo_pytest_0 = {
+            "id": 0,
+            "title": "PytestFixture",
+            "description": "FirstInstance",
+            "completed": True
+        }
+
+        todo_pytest_1 = {
+            "id": 1,
+            "title": "AnotherPytestFixture",
+            "description": "SecondInstance",
+            "completed": True
+        }
+
+        return [todo_pytest_0, todo_pytest_1]
+
+    def test_get_document_by_query_operators(self, memory_store, todo_document_fix):
+        for document_fix in todo_document_fix:
+            memory_store.add_document("todo_list_db", "todo_list_collection", document_fix)
+
+        by_range = list(memory_store.get_document_by_query("todo_list_db", "todo_list_collection",
+                                                           {"id": {"$gte": 2}}))
+        by_prefix = list(memory_store.get_document_by_query("todo_list_db", "todo_list_collection",
+                                                            {"title": {"$regex": "^Another"}}))
+        by_in = list(memory_store.get_document_by_query("todo_list_db", "todo_list_collection",
+                                                        {"id": {"$in": [1, 3]}, "completed": True}))
+
+        assert [document["id"] for document in by_range] == [2]
+        assert [document["title"] for document in by_prefix] == ["AnotherPytestFixture"]
+        assert [document["id"] for document in by_in] == [1]
+
+    def test_update_document_id_keeps_index_sorted(self, memory_store, todo_document_fix):
+        for document_fix in todo_document_fix:
+            memory_store.add_document("todo_list_db", "todo_list_collection", document_fix)
+
+        memory_store.update_document_by_id("todo_list_db", "todo_list_collection", 1, {"id": 10})
+        page = memory_store.get_documents_page("todo_list_db", "todo_list_collection", 10, after_id=1)
+
+        assert [document["id"] for document in page] == [2, 10]
+        assert memory_store.get_document_by_id("todo_list_db", "todo_list_collection", 1) is None
+
+    def test_projection(self, memory_store, todo_document_fix):
+        memory_store.add_document("todo_list_db", "todo_list_collection", todo_document_fix[0])
+
+        document = memory_store.get_document_by_id("todo_list_db", "todo_list_collection", 1, ["title"])
+
+        assert document == {"id": 1, "version": 1, "title": "PytestFixture"}
+
+    def test_get_document_by_query_sort_and_limit(self, memory_store, todo_document_fix):
+        for document_fix in todo_document_fix * 2:
+            memory_store.add_document("todo_list_db", "todo_list_collection", dict(document_fix))
+
+        by_title = list(memory_store.get_document_by_query("todo_list_db", "todo_list_collection", {"id": {"$gt": 1}},
+                                                           sort=[("title", -1), ("id", 1)], limit=2))
+
+        assert [(document["title"], document["id"]) for document in by_title] == [("PytestFixture", 3),
+                                                                                  ("AnotherPytestFixture", 2)]
+
+    def test_search_documents(self, memory_store):
+        for title, description in (("Buy milk", "from the corner shop"), ("Call the shop", "about the milk order"),
+                                   ("Water plants", "before the weekend")):
+            memory_store.add_document("todo_list_db", "todo_list_collection",
+                                      {"title": title, "description": description, "completed": False})
+
+        ranked = memory_store.search_documents("todo_list_db", "todo_list_collection", "Milk", 10)
+        memory_store.update_document_by_id("todo_list_db", "todo_list_collection", 1, {"title": "Buy bread"})
+        after_update = memory_store.search_documents("todo_list_db", "todo_list_collection", "milk", 10)
+        memory_store.delete_document_by_id("todo_list_db", "todo_list_collection", 2)
+        after_delete = memory_store.search_documents("todo_list_db", "todo_list_collection", "milk", 10, 0,
+                                                     ["title"])
+
+        # A title hit outweighs a description hit
+        assert [document["id"] for document in ranked] == [1, 2]
+        assert [document["id"] for document in after_update] == [2]
+        assert after_delete == []
+
+    def test_aggregate(self, memory_store, todo_document_fix):
+        for document_fix in todo_document_fix * 2:
+            memory_store.add_document("todo_list_db", "todo_list_collection", dict(document_fix))
+        memory_store.update_document_by_id("todo_list_db", "todo_list_collection", 4, {"completed": False})
+
+        result = memory_store.aggregate("todo_list_db", "todo_list_collection", [
+            {"$match": {"id": {"$gte": 2}}},
+            {"$facet": {
+                "by_completed": [{"$group": {"_id": "$completed", "count": {"$sum": 1}}}, {"$sort": {"_id": 1}}],
+                "by_pair": [{"$group": {"_id": {"$subtract": ["$id", {"$mod": ["$id", 2]}]},
+                                        "count": {"$sum": 1}, "last": {"$max": "$id"}}}],
+                "total": [{"$count": "n"}]
+            }}
+        ])
+
+        assert result == [{
+            "by_completed": [{"_id": False, "count": 1}, {"_id": True, "count": 2}],
+            "by_pair": [{"_id": 2, "count": 2, "last": 3}, {"_id": 4, "count": 1, "last": 4}],
+            "total": [{"n": 3}]
+        }]
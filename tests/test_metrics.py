@@ -0,0 +1,107 @@
+import pytest
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from utils.memory_store import InMemoryToDoDBStore
+from utils.metrics import (InstrumentedStore, MetricsMiddleware, MetricsRegistry, db_documents_returned,
+                           db_operation_duration_seconds, db_operation_errors_total, http_request_errors_total,
+                           http_requests_total)
+
+
+class TestMetrics:
+    def test_render_histogram_is_cumulative(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_seconds", "Test latency.", ("operation",), buckets=(0.1, 1.0))
+        histogram.labels("read").observe(0.05)
+        histogram.labels("read").observe(0.5)
+        histogram.labels("read").observe(5.0)
+
+        text = registry.render()
+
+        assert '# TYPE test_seconds histogram' in text
+        assert 'test_seconds_bucket{operation="read",le="0.1"} 1' in text
+        assert 'test_seconds_bucket{operation="read",le="1.0"} 2' in text
+        assert 'test_seconds_bucket{operation="read",le="+Inf"} 3' in text
+        assert 'test_seconds_count{operation="read"} 3' in text
+
+    def test_duplicate_metric_rejected(self):
+        registry = MetricsRegistry()
+        registry.counter("test_total", "Test counter.")
+
+        with pytest.raises(ValueError):
+            registry.counter("test_total", "Test counter.")
+
+    def test_instrumented_store_records_calls(self):
+        store = InstrumentedStore(InMemoryToDoDBStore(collections={}))
+        calls = db_operation_duration_seconds.labels("get_all_documents").counts[:]
+
+        store.add_document("db", "coll", {"title": "a", "description": "b", "completed": False})
+        documents = store.get_all_documents("db", "coll")
+
+        assert len(documents) == 1
+        assert sum(db_operation_duration_seconds.labels("get_all_documents").counts) == sum(calls) + 1
+        assert db_documents_returned.labels("get_all_documents").sum >= 1
+
+    def test_instrumented_store_counts_errors(self):
+        store = InstrumentedStore(InMemoryToDoDBStore(collections={}))
+        errors = db_operation_errors_total.labels("update_documents_by_id").value
+
+        with pytest.raises(TypeError):
+            store.update_documents_by_id("db", "coll", None)
+
+        assert db_operation_errors_total.labels("update_documents_by_id").value == errors + 1
+
+    def test_instrumented_store_observes_drained_cursor(self):
+        store = InstrumentedStore(InMemoryToDoDBStore(collections={}))
+        for title in ("a", "b", "c"):
+            store.add_document("db", "coll", {"title": title, "description": "b", "completed": False})
+        calls = sum(db_operation_duration_seconds.labels("get_document_by_query").counts)
+        returned = db_documents_returned.labels("get_document_by_query").sum
+
+        cursor = store.get_document_by_query("db", "coll", {}).batch_size(2)
+
+        # Nothing is observed until the query has actually been fetched
+        assert sum(db_operation_duration_seconds.labels("get_document_by_query").counts) == calls
+        assert len(list(cursor)) == 3
+        cursor.close()
+        assert sum(db_operation_duration_seconds.labels("get_document_by_query").counts) == calls + 1
+        assert db_documents_returned.labels("get_document_by_query").sum == returned + 3
+
+    def test_instrumented_cursor_counts_iteration_errors(self, monkeypatch):
+        store = InstrumentedStore(InMemoryToDoDBStore(collections={}))
+        store.add_document("db", "coll", {"title": "a", "description": "b", "completed": False})
+        errors = db_operation_errors_total.labels("get_document_by_query").value
+        cursor = store.get_document_by_query("db", "coll", {})
+
+        class LostCursor:
+            def __next__(self):
+                raise RuntimeError("cursor lost")
+
+        monkeypatch.setattr(cursor, "_cursor", LostCursor())
+
+        with pytest.raises(RuntimeError):
+            list(cursor)
+
+        assert db_operation_errors_total.labels("get_document_by_query").value == errors + 1
+
+    def test_middleware_labels_by_route_template(self):
+        app = FastAPI()
+
+        @app.get("/items/{item_id}")
+        async def get_item(item_id: int):
+            if item_id == 0:
+                raise HTTPException(status_code=404, detail="missing")
+            return {"id": item_id}
+
+        app.add_middleware(MetricsMiddleware)
+        client = TestClient(app)
+        ok = http_requests_total.labels("GET", "/items/{item_id}", "200").value
+        missing = http_request_errors_total.labels("GET", "/items/{item_id}", "404").value
+
+        client.get("/items/1")
+        client.get("/items/2")
+        client.get("/items/0")
+
+        assert http_requests_total.labels("GET", "/items/{item_id}", "200").value == ok + 2
+        assert http_request_errors_total.labels("GET", "/items/{item_id}", "404").value == missing + 1
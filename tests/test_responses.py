@@ -0,0 +1,24 @@
+import json
+
+from bson import ObjectId
+
+from models.todo_model import ToDoModel
+from utils.responses import FastJSONResponse, dumps
+
+
+class TestResponses:
+    def test_dumps_encodes_object_ids_and_models(self):
+        oid = ObjectId()
+        todo = ToDoModel(id=1, title="a", description="b", completed=False, version=3)
+
+        assert json.loads(dumps({"oid": oid, "todo": todo})) == {
+            "oid": str(oid),
+            "todo": {"id": 1, "title": "a", "description": "b", "completed": False}
+        }
+
+    def test_response_renders_with_dumps(self):
+        oid = ObjectId()
+        response = FastJSONResponse({"oid": oid})
+
+        assert response.body == dumps({"oid": oid})
+        assert response.media_type == "application/json"
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import pytest
+
+from models.todo_model import ToDoModel
+from services.async_todo_services import AsyncToDoServices
+from utils.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    def test_concurrent_async_calls_share_one_call(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"id": 1}
+
+        async def scenario():
+            return await asyncio.gather(*(single_flight.do_async(("todo", 1), load) for _ in range(5)))
+
+        results = asyncio.run(scenario())
+
+        assert len(calls) == 1
+        assert results == [{"id": 1}] * 5
+        assert single_flight.stats() == {"in_flight": 0, "calls": 1, "shared": 4, "shared_ratio": 0.8}
+
+    def test_different_keys_do_not_share(self):
+        single_flight = SingleFlight()
+
+        async def scenario():
+            return await asyncio.gather(single_flight.do_async(("todo", 1), lambda: asyncio.sleep(0.01, 1)),
+                                        single_flight.do_async(("todo", 2), lambda: asyncio.sleep(0.01, 2)))
+
+        assert asyncio.run(scenario()) == [1, 2]
+        assert single_flight.stats()["shared"] == 0
+
+    def test_exception_reaches_every_caller(self):
+        single_flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("down")
+
+        async def scenario():
+            return await asyncio.gather(*(single_flight.do_async(("all", None), load) for _ in range(3)),
+                                        return_exceptions=True)
+
+        results = asyncio.run(scenario())
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert single_flight.stats()["calls"] == 1
+
+    def test_completed_call_is_not_reused(self):
+        single_flight = SingleFlight()
+
+        async def scenario():
+            first = await single_flight.do_async(("todo", 1), lambda: asyncio.sleep(0, "first"))
+            second = await single_flight.do_async(("todo", 1), lambda: asyncio.sleep(0, "second"))
+            return first, second
+
+        assert asyncio.run(scenario()) == ("first", "second")
+
+    def test_forget_makes_later_callers_start_a_new_call(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            number = len(calls)
+            await asyncio.sleep(0.01)
+            return number
+
+        async def scenario():
+            early = asyncio.ensure_future(single_flight.do_async(("page", 100, None), load))
+            await asyncio.sleep(0)
+            single_flight.forget(lambda key: key[0] == "page")
+            late = await single_flight.do_async(("page", 100, None), load)
+            return await early, late
+
+        assert asyncio.run(scenario()) == (1, 2)
+
+    def test_threads_share_one_call(self):
+        single_flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def load():
+            calls.append(1)
+            started.set()
+            release.wait(1.0)
+            return "shared"
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(single_flight.do(("todo", 1), load)))
+        leader.start()
+        started.wait(1.0)
+        followers = [threading.Thread(target=lambda: results.append(single_flight.do(("todo", 1), load)))
+                     for _ in range(3)]
+        for follower in followers:
+            follower.start()
+        while single_flight.stats()["shared"] < 3:
+            pass
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == ["shared"] * 4
+
+    @pytest.mark.parametrize("read", ["get_todo_by_id", "get_all_todos", "get_todos_page"])
+    def test_services_coalesce_identical_reads(self, read):
+        todo_services_test = AsyncToDoServices(single_flight=SingleFlight())
+        todo = ToDoModel(id=0, title="Coalesced", description="Shared read", completed=False)
+        call = {"get_todo_by_id": lambda: todo_services_test.get_todo_by_id(1),
+                "get_all_todos": lambda: todo_services_test.get_all_todos(),
+                "get_todos_page": lambda: todo_services_test.get_todos_page(100)}[read]
+
+        async def scenario():
+            await todo_services_test.delete_all_todos()
+            await todo_services_test.add_todo(todo)
+            results = await asyncio.gather(*(call() for _ in range(10)))
+            await todo_services_test.delete_all_todos()
+            return results
+
+        results = asyncio.run(scenario())
+
+        assert all(result == results[0] for result in results)
+        assert todo_services_test.single_flight.stats()["calls"] == 1
+        assert todo_services_test.single_flight.stats()["shared"] == 9
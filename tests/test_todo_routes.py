@@ -1,9 +1,12 @@
+import asyncio
+import json
 import pytest
 
 from fastapi.testclient import TestClient
 from fastapi import HTTPException
 
 from routes.todo_routes import router, todo_services
+from utils.config import settings
 from utils.db_store import ToDoDBStore
 
 
@@ -64,6 +67,30 @@ class TestToDoListRoutes:
             assert response.json().get("error") is not None
         todo_list_routes.delete("/")
 
+    def test_create_todos_bulk(self, todo_list_routes, todo_list_good):
+        todo_list_routes.delete("/")
+        response = todo_list_routes.post("/bulk", json=[todo_list_good] * 3)
+
+        assert response.status_code == 200
+        assert response.json().get("inserted") == 3
+        assert [result.get("id") for result in response.json().get("results")] == [1, 2, 3]
+        todo_list_routes.delete("/")
+
+    def test_create_todos_bulk_empty(self, todo_list_routes):
+        response = todo_list_routes.post("/bulk", json=[])
+
+        assert response.status_code == 200
+        assert response.json() == {"inserted": 0, "failed": 0, "results": []}
+
+    def test_create_todos_bulk_bad(self, todo_list_routes, todo_list_good, todo_list_bad):
+        todo_list_routes.delete("/")
+        with pytest.raises(HTTPException) as exc_info:
+            todo_list_routes.post("/bulk", json=[todo_list_good, todo_list_bad])
+
+        assert exc_info.value.status_code == 400
+        assert "1.id: Input should be a valid integer" in exc_info.value.detail
+        todo_list_routes.delete("/")
+
     def test_get_todo_by_id_good(self, todo_list_routes, todo_list_good):
         todo_list_routes.delete("/")
         todo_list_routes.post("/", json=todo_list_good)
@@ -88,6 +115,35 @@ class TestToDoListRoutes:
         assert exc_info.value.status_code == 404
         assert exc_info.value.detail == f"Todo with ID {bad_id} not found."
 
+    def test_get_todo_by_id_storage_error(self, todo_list_routes, monkeypatch):
+        # A failing store must not be reported as a missing todo
+        async def mock_get_document_by_id(*args, **kwargs):
+            raise Exception("Database connection error occurred")
+
+        monkeypatch.setattr(todo_services.db, "get_document_by_id", mock_get_document_by_id)
+
+        with pytest.raises(HTTPException) as exc_info:
+            todo_list_routes.get("/1")
+
+        assert exc_info.value.status_code == 500
+        assert exc_info.value.detail == "Database connection error occurred"
+
+    def test_get_todo_by_id_point_read(self, todo_list_routes, todo_list_good, monkeypatch):
+        todo_list_routes.delete("/")
+        todo_list_routes.post("/", json=todo_list_good)
+
+        # A point read must not fall back to loading the whole collection
+        def mock_get_all_todos(*args, **kwargs):
+            raise Exception("get_all_todos should not be called")
+
+        monkeypatch.setattr(todo_services, "get_all_todos", mock_get_all_todos)
+        response = todo_list_routes.get(f"/{todo_list_good.get('id')}")
+
+        assert response.status_code == 200
+        for key, value in todo_list_good.items():
+            assert response.json().get("update_todo").get(key) == value
+        todo_list_routes.delete("/")
+
     def test_get_todo_all_good(self, todo_list_routes, todo_list_good):
         todo_list_routes.delete("/")
         todo_list_routes.post("/", json=todo_list_good)
@@ -99,9 +155,161 @@ class TestToDoListRoutes:
         assert any(item == todo_list_good for item in response.json())
         todo_list_routes.delete("/")
 
+    def test_get_todo_page(self, todo_list_routes, todo_list_good):
+        todo_list_routes.delete("/")
+        for _ in range(3):
+            todo_list_routes.post("/", json=todo_list_good)
+
+        first_page = todo_list_routes.get("/", params={"limit": 2})
+
+        assert first_page.status_code == 200
+        assert [todo.get("id") for todo in first_page.json()] == [1, 2]
+        assert first_page.headers.get("X-Next-Cursor") == "2"
+
+        last_page = todo_list_routes.get("/", params={"limit": 2, "after_id": first_page.headers["X-Next-Cursor"]})
+
+        assert [todo.get("id") for todo in last_page.json()] == [3]
+        assert last_page.headers.get("X-Next-Cursor") is None
+        todo_list_routes.delete("/")
+
+    def test_get_todo_filters(self, todo_list_routes, todo_list_good):
+        todo_list_routes.delete("/")
+        for title, completed in (("Buy milk", False), ("Buy eggs", True), ("Call mom", False), ("Buy.x", True)):
+            todo_list_routes.post("/", json={**todo_list_good, "title": title, "completed": completed})
+
+        open_todos = todo_list_routes.get("/", params={"completed": "false"})
+        buy_todos = todo_list_routes.get("/", params={"title_prefix": "Buy", "sort": "-title"})
+        escaped = todo_list_routes.get("/", params={"title_prefix": "Buy."})
+        in_range = todo_list_routes.get("/", params={"min_id": 2, "max_id": 3})
+
+        assert [todo.get("id") for todo in open_todos.json()] == [1, 3]
+        assert [todo.get("title") for todo in buy_todos.json()] == ["Buy.x", "Buy milk", "Buy eggs"]
+        assert [todo.get("title") for todo in escaped.json()] == ["Buy.x"]
+        assert [todo.get("id") for todo in in_range.json()] == [2, 3]
+        todo_list_routes.delete("/")
+
+    def test_get_todo_filtered_pages(self, todo_list_routes, todo_list_good):
+        todo_list_routes.delete("/")
+        for index in range(5):
+            todo_list_routes.post("/", json={**todo_list_good, "completed": index % 2 == 0})
+
+        first_page = todo_list_routes.get("/", params={"completed": "true", "limit": 2})
+        last_page = todo_list_routes.get("/", params={"completed": "true", "limit": 2,
+                                                      "after_id": first_page.headers["X-Next-Cursor"]})
+        descending = todo_list_routes.get("/", params={"sort": "-id", "limit": 2, "after_id": 4})
+
+        assert [todo.get("id") for todo in first_page.json()] == [1, 3]
+        assert [todo.get("id") for todo in last_page.json()] == [5]
+        assert last_page.headers.get("X-Next-Cursor") is None
+        assert [todo.get("id") for todo in descending.json()] == [3, 2]
+
+        with pytest.raises(HTTPException) as bad_sort:
+            todo_list_routes.get("/", params={"sort": "description"})
+        with pytest.raises(HTTPException) as bad_cursor:
+            todo_list_routes.get("/", params={"sort": "title", "after_id": 1})
+
+        assert bad_sort.value.status_code == 400
+        assert bad_cursor.value.status_code == 400
+        todo_list_routes.delete("/")
+
+    def test_get_todo_sorted_pages(self, todo_list_routes, todo_list_good):
+        todo_list_routes.delete("/")
+        for title in ("b", "a", "b", "c", "a"):
+            todo_list_routes.post("/", json={**todo_list_good, "title": title})
+
+        def read_all(sort):
+            pages = []
+            params = {"sort": sort, "limit": 2, "fields": "completed"}
+            while True:
+                page = todo_list_routes.get("/", params=params)
+                pages.append([(todo.get("title"), todo.get("id")) for todo in page.json()])
+                if page.headers.get("X-Next-Cursor") is None:
+                    return pages
+                params["after"] = page.headers["X-Next-Cursor"]
+
+        assert read_all("title") == [[("a", 2), ("a", 5)], [("b", 1), ("b", 3)], [("c", 4)]]
+        assert read_all("-title") == [[("c", 4), ("b", 3)], [("b", 1), ("a", 5)], [("a", 2)]]
+
+        with pytest.raises(HTTPException) as id_sort:
+            todo_list_routes.get("/", params={"after": "WyJhIiwxXQ=="})
+        with pytest.raises(HTTPException) as wrong_field:
+            todo_list_routes.get("/", params={"sort": "completed", "after": "WyJhIiwxXQ=="})
+        with pytest.raises(HTTPException) as garbage:
+            todo_list_routes.get("/", params={"sort": "title", "after": "not a cursor"})
+
+        assert id_sort.value.status_code == 400
+        assert wrong_field.value.status_code == 400
+        assert garbage.value.status_code == 400
+        todo_list_routes.delete("/")
+
+    def test_search_todos(self, todo_list_routes, todo_list_good):
+        todo_list_routes.delete("/")
+        asyncio.run(todo_services.ensure_indexes())
+        for title, description in (("Buy milk", "Corner shop"), ("Call the shop", "Ask about milk"),
+                                   ("Water plants", "Garden")):
+            todo_list_routes.post("/", json={**todo_list_good, "title": title, "description": description})
+
+        first_page = todo_list_routes.get("/search", params={"q": "milk", "limit": 1})
+        last_page = todo_list_routes.get("/search", params={"q": "milk", "limit": 1,
+                                                            "offset": first_page.headers["X-Next-Offset"]})
+        no_match = todo_list_routes.get("/search", params={"q": "holiday", "fields": "title"})
+
+        assert [todo.get("title") for todo in first_page.json()] == ["Buy milk"]
+        assert [todo.get("title") for todo in last_page.json()] == ["Call the shop"]
+        assert last_page.headers.get("X-Next-Offset") is None
+        assert no_match.json() == []
+        todo_list_routes.delete("/")
+
+    def test_get_stats(self, todo_list_routes, todo_list_good):
+        todo_list_routes.delete("/")
+        for index in range(5):
+            todo_list_routes.post("/", json={**todo_list_good, "completed": index < 2})
+
+        response = todo_list_routes.get("/stats", params={"bucket_size": 4})
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "total": 5,
+            "completed": 2,
+            "open": 3,
+            "by_id_range": [{"from": 0, "to": 3, "count": 3}, {"from": 4, "to": 7, "count": 2}],
+            "truncated": False
+        }
+        todo_list_routes.delete("/")
+
+    def test_get_stats_caps_buckets(self, todo_list_routes, todo_list_good, monkeypatch):
+        monkeypatch.setattr(settings, "stats_max_buckets", 2)
+        todo_list_routes.delete("/")
+        for _ in range(5):
+            todo_list_routes.post("/", json=todo_list_good)
+
+        response = todo_list_routes.get("/stats", params={"bucket_size": 1})
+
+        assert response.status_code == 200
+        assert response.json()["total"] == 5
+        assert [group["from"] for group in response.json()["by_id_range"]] == [1, 2]
+        assert response.json()["truncated"] is True
+        todo_list_routes.delete("/")
+
+    def test_get_todo_fields(self, todo_list_routes, todo_list_good):
+        todo_list_routes.delete("/")
+        todo_list_routes.post("/", json=todo_list_good)
+
+        all_response = todo_list_routes.get("/", params={"fields": "title,completed"})
+        by_id_response = todo_list_routes.get(f"/{todo_list_good.get('id')}", params={"fields": "title"})
+
+        assert all_response.json() == [{"id": 1, "title": todo_list_good.get("title"), "completed": True}]
+        assert by_id_response.json().get("update_todo") == {"id": 1, "title": todo_list_good.get("title")}
+
+        with pytest.raises(HTTPException) as exc_info:
+            todo_list_routes.get("/", params={"fields": "title,secret"})
+
+        assert exc_info.value.status_code == 400
+        todo_list_routes.delete("/")
+
     def test_get_todo_all_bad(self, todo_list_routes, monkeypatch):
         # Mocking the todo_services.get_all_todos method to raise an exception
-        def mock_get_all_todos():
+        def mock_get_all_todos(*args, **kwargs):
             raise Exception("Database connection error occurred")
 
         monkeypatch.setattr(todo_services, "get_all_todos", mock_get_all_todos)
@@ -112,6 +320,20 @@ class TestToDoListRoutes:
         assert exc_info.value.status_code == 500
         assert exc_info.value.detail == "Database connection error occurred"
 
+    def test_export_todos(self, todo_list_routes, todo_list_good):
+        todo_list_routes.delete("/")
+        for _ in range(3):
+            todo_list_routes.post("/", json=todo_list_good)
+
+        response = todo_list_routes.get("/export", params={"batch_size": 2})
+        lines = [json.loads(line) for line in response.text.splitlines()]
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert [line.get("id") for line in lines] == [1, 2, 3]
+        assert all(line.get("title") == todo_list_good.get("title") for line in lines)
+        todo_list_routes.delete("/")
+
     def test_update_todo_by_id_good(self, todo_list_routes, todo_list_good, todo_list_update):
         todo_list_routes.delete("/")
         todo_list_routes.post("/", json=todo_list_good)
@@ -121,6 +343,130 @@ class TestToDoListRoutes:
         assert response.status_code == 200
         assert response.json() == {"result": f"Documents updated: 1"}
 
+    def test_update_todos_bulk(self, todo_list_routes, todo_list_good):
+        todo_list_routes.delete("/")
+        todo_list_routes.post("/bulk", json=[todo_list_good] * 3)
+        response = todo_list_routes.patch("/bulk", json=[
+            {"id": 1, "fields": {"completed": False}},
+            {"id": 2, "fields": {"completed": False}},
+            {"id": 999, "fields": {"completed": False}}
+        ])
+
+        assert response.status_code == 200
+        assert response.json() == {"matched": 2, "modified": 2}
+        todo_list_routes.delete("/")
+
+    def test_update_todos_bulk_partial_failure(self, todo_list_routes, todo_list_good):
+        # The id change only fails because of the unique index on id
+        asyncio.run(todo_services.ensure_indexes())
+        todo_list_routes.delete("/")
+        todo_list_routes.post("/bulk", json=[todo_list_good] * 2)
+        response = todo_list_routes.patch("/bulk", json=[
+            {"id": 1, "fields": {"title": "Applied"}},
+            {"id": 2, "fields": {"id": 1}}
+        ])
+
+        assert response.status_code == 200
+        assert response.json()["matched"] == 1
+        assert response.json()["modified"] == 1
+        assert [failure["index"] for failure in response.json()["failed"]] == [1]
+        assert todo_list_routes.get("/1").json()["update_todo"]["title"] == "Applied"
+        todo_list_routes.delete("/")
+
+    def test_delete_todos_bulk(self, todo_list_routes, todo_list_good):
+        todo_list_routes.delete("/")
+        todo_list_routes.post("/bulk", json=[todo_list_good] * 3)
+        response = todo_list_routes.request("DELETE", "/bulk", json=[1, 3, 999])
+
+        assert response.status_code == 200
+        assert response.json() == {"deleted": 2}
+        assert [todo.get("id") for todo in todo_list_routes.get("/").json()] == [2]
+        todo_list_routes.delete("/")
+
+    def test_get_todo_by_id_not_modified(self, todo_list_routes, todo_list_good):
+        todo_list_routes.delete("/")
+        todo_list_routes.post("/", json=todo_list_good)
+        response = todo_list_routes.get(f"/{todo_list_good.get('id')}")
+        etag = response.headers.get("ETag")
+
+        not_modified = todo_list_routes.get(f"/{todo_list_good.get('id')}", headers={"If-None-Match": etag})
+
+        assert etag is not None
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+
+        todo_list_routes.put(f"/{todo_list_good.get('id')}", json={"completed": False})
+        changed = todo_list_routes.get(f"/{todo_list_good.get('id')}", headers={"If-None-Match": etag})
+
+        assert changed.status_code == 200
+        assert changed.headers.get("ETag") != etag
+        todo_list_routes.delete("/")
+
+    def test_get_todo_all_not_modified(self, todo_list_routes, todo_list_good):
+        todo_list_routes.delete("/")
+        todo_list_routes.post("/", json=todo_list_good)
+        etag = todo_list_routes.get("/").headers.get("ETag")
+
+        response = todo_list_routes.get("/", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        todo_list_routes.delete("/")
+
+    def test_update_todo_by_id_if_match(self, todo_list_routes, todo_list_good, todo_list_update):
+        todo_list_routes.delete("/")
+        todo_list_routes.post("/", json=todo_list_good)
+        etag = todo_list_routes.get(f"/{todo_list_good.get('id')}").headers.get("ETag")
+
+        response = todo_list_routes.put(f"/{todo_list_good.get('id')}", json=todo_list_update,
+                                        headers={"If-Match": etag})
+
+        assert response.status_code == 200
+        assert response.headers.get("ETag") == todo_list_routes.get(f"/{todo_list_good.get('id')}").headers["ETag"]
+
+        # The ETag is stale now, so a second conditional update must be refused
+        with pytest.raises(HTTPException) as exc_info:
+            todo_list_routes.put(f"/{todo_list_good.get('id')}", json=todo_list_update, headers={"If-Match": etag})
+
+        assert exc_info.value.status_code == 412
+        todo_list_routes.delete("/")
+
+    def test_update_todo_by_id_if_match_storage_error(self, todo_list_routes, todo_list_good, todo_list_update,
+                                                      monkeypatch):
+        todo_list_routes.delete("/")
+        todo_list_routes.post("/", json=todo_list_good)
+        etag = todo_list_routes.get(f"/{todo_list_good.get('id')}").headers.get("ETag")
+
+        # A failing write is not a failed precondition just because the request was conditional
+        async def mock_update_document_by_id(*args, **kwargs):
+            raise Exception("Database connection error occurred")
+
+        monkeypatch.setattr(todo_services.db, "update_document_by_id", mock_update_document_by_id)
+
+        with pytest.raises(HTTPException) as exc_info:
+            todo_list_routes.put(f"/{todo_list_good.get('id')}", json=todo_list_update, headers={"If-Match": etag})
+
+        assert exc_info.value.status_code == 400
+        assert exc_info.value.detail == "Database connection error occurred"
+        monkeypatch.undo()
+        todo_list_routes.delete("/")
+
+    def test_update_todo_by_id_if_match_any(self, todo_list_routes, todo_list_good, todo_list_update):
+        todo_list_routes.delete("/")
+        todo_list_routes.post("/", json=todo_list_good)
+
+        response = todo_list_routes.put(f"/{todo_list_good.get('id')}", json=todo_list_update,
+                                        headers={"If-Match": "*"})
+
+        assert response.status_code == 200
+        assert response.json() == {"result": "Documents updated: 1"}
+
+        # "*" still requires the todo to exist
+        with pytest.raises(HTTPException) as exc_info:
+            todo_list_routes.put("/999999", json=todo_list_update, headers={"If-Match": "*"})
+
+        assert exc_info.value.status_code == 412
+        todo_list_routes.delete("/")
+
     def test_update_todo_by_id_bad(self, todo_list_routes, todo_list_bad, todo_list_update):
         todo_list_routes.delete("/")
         with pytest.raises(HTTPException) as exc_info:
@@ -140,6 +486,18 @@ class TestToDoListRoutes:
         assert response.json().get("message") == f"Todo with ID {todo_list_good.get('id')} deleted successfully."
         todo_list_routes.delete("/")
 
+    def test_delete_todo_by_id_removes_document(self, todo_list_routes, todo_list_good):
+        todo_list_routes.delete("/")
+        todo_list_routes.post("/", json=todo_list_good)
+        response = todo_list_routes.delete(f"/{todo_list_good.get('id')}")
+
+        assert response.json().get("deleted_todo") == todo_list_good
+        with pytest.raises(HTTPException) as exc_info:
+            todo_list_routes.get(f"/{todo_list_good.get('id')}")
+
+        assert exc_info.value.status_code == 404
+        todo_list_routes.delete("/")
+
     def test_delete_todo_by_id_bad(self, todo_list_routes, todo_list_good):
         todo_list_routes.delete("/")
         todo_list_routes.post("/", json=todo_list_good)
@@ -157,6 +515,19 @@ class TestToDoListRoutes:
 
         todo_list_routes.delete("/")
 
+    def test_delete_todo_by_id_storage_error(self, todo_list_routes, monkeypatch):
+        async def mock_delete_and_return_document_by_id(*args, **kwargs):
+            raise Exception("Database connection error occurred")
+
+        monkeypatch.setattr(todo_services.db, "delete_and_return_document_by_id",
+                            mock_delete_and_return_document_by_id)
+
+        with pytest.raises(HTTPException) as exc_info:
+            todo_list_routes.delete("/1")
+
+        assert exc_info.value.status_code == 500
+        assert exc_info.value.detail == "Database connection error occurred"
+
     def test_delete_todo_all_good(self, todo_list_routes, todo_list_good):
         todo_list_routes.delete("/")
         todo_list_routes.post("/", json=todo_list_good)
@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+
+from pymongo.errors import BulkWriteError, WriteError
+
+from models.todo_model import ToDoModel
+from services.async_todo_services import AsyncToDoServices
+from utils.write_batcher import WriteBatcher
+
+
+class RecordingInsert:
+    def __init__(self, error: Exception | None = None):
+        self.calls = []
+        self.error = error
+
+    async def __call__(self, documents):
+        self.calls.append(list(documents))
+        if self.error is not None:
+            raise self.error
+        for index, document in enumerate(documents):
+            document["_id"] = f"oid-{len(self.calls)}-{index}"
+
+
+class TestWriteBatcher:
+    def test_concurrent_submits_share_one_insert(self):
+        insert = RecordingInsert()
+        batcher = WriteBatcher(insert, max_batch_size=100, max_delay_seconds=0.01)
+
+        async def scenario():
+            return await asyncio.gather(*(batcher.submit({"title": str(index)}) for index in range(5)))
+
+        results = asyncio.run(scenario())
+
+        assert len(insert.calls) == 1
+        assert [result["title"] for result in results] == ["0", "1", "2", "3", "4"]
+        assert [result["_id"] for result in results] == [f"oid-1-{index}" for index in range(5)]
+        assert batcher.stats() == {"batches": 1, "documents": 5, "mean_batch_size": 5.0}
+
+    def test_full_batch_flushes_without_waiting(self):
+        insert = RecordingInsert()
+        batcher = WriteBatcher(insert, max_batch_size=2, max_delay_seconds=60)
+
+        async def scenario():
+            return await asyncio.wait_for(asyncio.gather(*(batcher.submit({}) for _ in range(4))), 1.0)
+
+        asyncio.run(scenario())
+
+        assert [len(call) for call in insert.calls] == [2, 2]
+
+    def test_failed_document_only_fails_its_caller(self):
+        error = BulkWriteError({"writeErrors": [{"index": 1, "code": 11000, "errmsg": "duplicate key"}]})
+        batcher = WriteBatcher(RecordingInsert(error), max_delay_seconds=0.001)
+
+        async def scenario():
+            return await asyncio.gather(*(batcher.submit({"title": str(index)}) for index in range(3)),
+                                        return_exceptions=True)
+
+        results = asyncio.run(scenario())
+
+        assert isinstance(results[1], WriteError)
+        assert results[1].code == 11000
+        assert [results[0]["title"], results[2]["title"]] == ["0", "2"]
+
+    def test_failed_insert_fails_every_caller(self):
+        batcher = WriteBatcher(RecordingInsert(RuntimeError("down")), max_delay_seconds=0.001)
+
+        async def scenario():
+            return await asyncio.gather(*(batcher.submit({}) for _ in range(3)), return_exceptions=True)
+
+        results = asyncio.run(scenario())
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    def test_drain_writes_pending_documents(self):
+        insert = RecordingInsert()
+        batcher = WriteBatcher(insert, max_delay_seconds=60)
+
+        async def scenario():
+            submitted = asyncio.ensure_future(batcher.submit({"title": "pending"}))
+            await asyncio.sleep(0)
+            await batcher.drain()
+            return await submitted
+
+        assert asyncio.run(scenario())["title"] == "pending"
+        assert len(insert.calls) == 1
+
+    @pytest.mark.parametrize("count", [1, 25])
+    def test_services_add_todo_through_batcher(self, count):
+        todo_services_test = AsyncToDoServices()
+        todo_services_test.write_batcher = WriteBatcher(todo_services_test._insert_batch, max_delay_seconds=0.005)
+        todo = ToDoModel(id=0, title="Batched", description="Coalesced insert", completed=False)
+
+        async def scenario():
+            await todo_services_test.delete_all_todos()
+            added = await asyncio.gather(*(todo_services_test.add_todo(todo) for _ in range(count)))
+            todos = await todo_services_test.get_all_todos()
+            await todo_services_test.delete_all_todos()
+            return added, todos
+
+        added, todos = asyncio.run(scenario())
+
+        assert all(result.get("oid") is not None for result in added)
+        assert sorted(todo.id for todo in todos) == list(range(1, count + 1))
+        assert todo_services_test.write_batcher.stats()["batches"] == 1
@@ -0,0 +1,126 @@
+import asyncio
+import functools
+import itertools
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Mapping, Any, Dict, List, Tuple
+from pymongo.results import UpdateResult, InsertOneResult, InsertManyResult, DeleteResult, BulkWriteResult
+
+from utils.config import settings
+from utils.storage import ToDoStorage, create_store
+
+
+class AsyncToDoDBStore:
+    """
+    Awaitable counterpart of ToDoDBStore (or any other ToDoStorage engine) for the async route handlers.
+
+    Every call runs the blocking pymongo operation on a dedicated thread pool (the same model Motor uses), so a slow
+    Mongo round trip only occupies a pool thread while the event loop keeps serving other requests. The pool should
+    be about as large as the MongoClient's maxPoolSize; extra threads would only queue for a connection.
+    """
+
+    def __init__(self, db_store: ToDoStorage | None = None, max_workers: int = settings.mongo_max_pool_size):
+        self.db_store = db_store or create_store()
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="todo-db")
+        return self._executor
+
+    async def _run(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(method, *args, **kwargs))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def initialize_db(self, db_name: str, db_collection: str):
+        return await self._run(self.db_store.initialize_db, db_name, db_collection)
+
+    async def ensure_indexes(self, db_name: str, collection_name: str) -> List[str]:
+        return await self._run(self.db_store.ensure_indexes, db_name, collection_name)
+
+    async def check_indexes(self, db_name: str, collection_name: str) -> Dict[str, List[str]]:
+        return await self._run(self.db_store.check_indexes, db_name, collection_name)
+
+    async def get_next_id(self, db_name, db_collection) -> int:
+        return await self._run(self.db_store.get_next_id, db_name, db_collection)
+
+    async def add_document(self, db_name: str, collection_name: str, document: dict) -> InsertOneResult:
+        return await self._run(self.db_store.add_document, db_name, collection_name, document)
+
+    async def add_documents(self, db_name: str, collection_name: str, documents: List[dict]) -> InsertManyResult:
+        return await self._run(self.db_store.add_documents, db_name, collection_name, documents)
+
+    async def get_document_by_id(self, db_name: str, collection_name: str, task_id: int,
+                                 fields: List[str] | None = None) -> Mapping[str, Any] | None:
+        return await self._run(self.db_store.get_document_by_id, db_name, collection_name, task_id, fields)
+
+    async def get_document_by_query(self, db_name: str, collection_name: str, query: dict,
+                                    fields: List[str] | None = None, sort: List[Tuple[str, int]] | None = None,
+                                    limit: int = 0) -> list:
+        # A Cursor fetches lazily while it is iterated, so it is drained on the pool thread instead of the loop.
+        def fetch():
+            return list(self.db_store.get_document_by_query(db_name, collection_name, query, fields, sort, limit))
+
+        return await self._run(fetch)
+
+    async def search_documents(self, db_name: str, collection_name: str, text: str, limit: int, offset: int = 0,
+                               fields: List[str] | None = None) -> list:
+        return await self._run(self.db_store.search_documents, db_name, collection_name, text, limit, offset, fields)
+
+    async def iter_document_batches(self, db_name: str, collection_name: str, query: dict,
+                                    batch_size: int) -> AsyncIterator[list]:
+        """
+        Yield the documents matching ``query`` in lists of at most ``batch_size``.
+
+        The next batch is only fetched once the consumer asks for it, so a slow reader holds back the cursor instead
+        of letting results pile up in memory.
+        """
+        cursor = await self._run(
+            lambda: self.db_store.get_document_by_query(db_name, collection_name, query).batch_size(batch_size))
+        try:
+            while True:
+                batch = await self._run(lambda: list(itertools.islice(cursor, batch_size)))
+                if not batch:
+                    break
+                yield batch
+        finally:
+            await self._run(cursor.close)
+
+    async def get_all_documents(self, db_name: str, collection_name: str, fields: List[str] | None = None) -> list:
+        return await self._run(self.db_store.get_all_documents, db_name, collection_name, fields)
+
+    async def aggregate(self, db_name: str, collection_name: str, pipeline: List[dict]) -> list:
+        return await self._run(self.db_store.aggregate, db_name, collection_name, pipeline)
+
+    async def get_documents_page(self, db_name: str, collection_name: str, limit: int,
+                                 after_id: int | None = None, fields: List[str] | None = None) -> list:
+        return await self._run(self.db_store.get_documents_page, db_name, collection_name, limit, after_id, fields)
+
+    async def update_document_by_id(self, db_name: str, collection_name: str, task_id: int, document: dict,
+                                    expected_version: int | None = None) -> UpdateResult:
+        return await self._run(self.db_store.update_document_by_id, db_name, collection_name, task_id, document,
+                               expected_version)
+
+    async def update_documents_by_id(self, db_name: str, collection_name: str,
+                                     updates: List[Tuple[int, dict]]) -> BulkWriteResult:
+        return await self._run(self.db_store.update_documents_by_id, db_name, collection_name, updates)
+
+    async def delete_documents_by_id(self, db_name: str, collection_name: str, task_ids: List[int]) -> DeleteResult:
+        return await self._run(self.db_store.delete_documents_by_id, db_name, collection_name, task_ids)
+
+    async def delete_document_by_id(self, db_name: str, collection_name: str, task_id: int) -> DeleteResult:
+        return await self._run(self.db_store.delete_document_by_id, db_name, collection_name, task_id)
+
+    async def delete_and_return_document_by_id(self, db_name: str, collection_name: str,
+                                               task_id: int) -> Mapping[str, Any] | None:
+        return await self._run(self.db_store.delete_and_return_document_by_id, db_name, collection_name, task_id)
+
+    async def delete_all_documents(self, db_name: str, collection_name: str, query: dict) -> DeleteResult:
+        return await self._run(self.db_store.delete_all_documents, db_name, collection_name, query)
@@ -0,0 +1,84 @@
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from utils.config import settings
+
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries also expire ``ttl`` seconds after they were stored.
+
+    Safe to share between threads. ``hits``/``misses``/``evictions`` are kept so the cache can be sized from
+    real traffic.
+    """
+
+    MISSING = object()
+
+    def __init__(self, max_size: int = 1024, ttl: float = 5.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Return the cached value, or ``TTLCache.MISSING`` when the key is absent or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return self.MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]):
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+
+def cache_from_settings() -> TTLCache | None:
+    if not settings.cache_enabled:
+        return None
+    return TTLCache(settings.cache_max_size, settings.cache_ttl_seconds)
+
+
+def stats_cache_from_settings() -> TTLCache | None:
+    if settings.stats_cache_ttl_seconds <= 0:
+        return None
+    return TTLCache(max_size=32, ttl=settings.stats_cache_ttl_seconds)
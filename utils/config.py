@@ -0,0 +1,59 @@
+import os
+
+from pydantic import BaseModel
+
+
+class Settings(BaseModel):
+    """
+    Runtime settings. Every field can be overridden with a ``TODO_``-prefixed environment variable,
+    e.g. ``TODO_MONGO_URI`` or ``TODO_MONGO_MAX_POOL_SIZE``.
+    """
+
+    # "mongo" or "memory"; the in-memory engine keeps everything in this process
+    storage_backend: str = "mongo"
+    mongo_uri: str = "mongodb://localhost:27017"
+    mongo_max_pool_size: int = 100
+    mongo_min_pool_size: int = 0
+    mongo_connect_timeout_ms: int = 20000
+    mongo_server_selection_timeout_ms: int = 30000
+    mongo_socket_timeout_ms: int | None = None
+    mongo_wait_queue_timeout_ms: int | None = None
+    mongo_read_preference: str = "primary"
+    mongo_write_concern: str = "1"
+    id_block_size: int = 100
+    export_batch_size: int = 1000
+    cache_enabled: bool = False
+    cache_max_size: int = 1024
+    cache_ttl_seconds: float = 5.0
+    # Concurrent identical reads of one todo, the first page or the whole list share a single storage call
+    single_flight_enabled: bool = True
+    # GET /stats results are reused for this long; 0 recomputes them on every call
+    stats_cache_ttl_seconds: float = 0.0
+    stats_bucket_size: int = 1000
+    # Upper bound on the id ranges GET /stats returns, keeping the $facet result well under Mongo's 16MB limit
+    stats_max_buckets: int = 1000
+    # "local" publishes change events from this process's writes; "change_stream" feeds them from Mongo instead
+    event_source: str = "local"
+    event_queue_size: int = 1000
+    event_history_size: int = 1000
+    event_heartbeat_seconds: float = 15.0
+    # Coalesce concurrent POST / inserts into one insert_many, waiting at most the delay for a batch to fill
+    write_batch_enabled: bool = False
+    write_batch_max_size: int = 100
+    write_batch_max_delay_ms: float = 2.0
+    log_level: str = "INFO"
+    # Fraction of records below WARNING that are kept; the queue bounds how many can wait for the writer thread
+    log_sample_rate: float = 1.0
+    log_queue_size: int = 10000
+
+    @classmethod
+    def from_env(cls, prefix: str = "TODO_") -> "Settings":
+        values = {}
+        for name in cls.model_fields:
+            env_name = f"{prefix}{name.upper()}"
+            if env_name in os.environ:
+                values[name] = os.environ[env_name]
+        return cls(**values)
+
+
+settings = Settings.from_env()
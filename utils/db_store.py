@@ -1,14 +1,38 @@
 import pymongo
 
-from typing import Mapping, Any
-from pymongo import MongoClient
+from typing import Mapping, Any, Dict, List, Tuple
+from pymongo import MongoClient, IndexModel, UpdateOne
 from pymongo.cursor import Cursor
-from pymongo.results import UpdateResult, InsertOneResult, DeleteResult
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from pymongo.results import UpdateResult, InsertOneResult, InsertManyResult, DeleteResult, BulkWriteResult
+
+from utils.id_allocator import IdAllocator, id_allocator
+from utils.mongo_client import get_client
 
 
 class ToDoDBStore:
-    def __init__(self):
-        self.client = MongoClient('localhost', 27017)
+    # Indexes every collection is expected to carry, keyed by collection name. "id" backs all point reads and
+    # writes. The others back filtering and sorting on completed/title with id as the tie breaker and page cursor,
+    # so those lists are read in index order; "text_search" backs /search.
+    index_registry: Dict[str, List[IndexModel]] = {
+        "todo_list_collection": [
+            IndexModel([("id", pymongo.ASCENDING)], name="id_unique", unique=True),
+            IndexModel([("completed", pymongo.ASCENDING), ("id", pymongo.ASCENDING)], name="completed_id"),
+            IndexModel([("title", pymongo.ASCENDING), ("id", pymongo.ASCENDING)], name="title_id"),
+            IndexModel([("title", pymongo.TEXT), ("description", pymongo.TEXT)], name="text_search",
+                       weights={"title": 3, "description": 1}),
+        ]
+    }
+
+    def __init__(self, allocator: IdAllocator | None = None, client: MongoClient | None = None):
+        self._client = client
+        self.id_allocator = allocator or id_allocator
+
+    @property
+    def client(self) -> MongoClient:
+        # Without an injected client every store shares the process-wide pool, which the app lifespan opens and
+        # closes; resolving it per call keeps long-lived stores valid across a close/reopen.
+        return self._client or get_client()
 
     def initialize_db(self, db_name: str, db_collection: str):
 
@@ -34,48 +58,168 @@ class ToDoDBStore:
         self.delete_document_by_id(db_name, db_collection, test_document_id)
         self.delete_all_documents(db_name, db_collection, {"id": test_document_id})
 
+    def ensure_indexes(self, db_name: str, collection_name: str) -> List[str]:
+        indexes = self.index_registry.get(collection_name, [])
+        if not indexes:
+            return []
+        collection = self.client[db_name][collection_name]
+        return collection.create_indexes(indexes)
+
+    def check_indexes(self, db_name: str, collection_name: str) -> Dict[str, List[str]]:
+        collection = self.client[db_name][collection_name]
+        expected = [index.document["name"] for index in self.index_registry.get(collection_name, [])]
+        existing = [name for name in collection.index_information() if name != "_id_"]
+
+        try:
+            index_stats = collection.aggregate([{"$indexStats": {}}])
+            unused = [stat["name"] for stat in index_stats
+                      if stat["name"] != "_id_" and stat.get("accesses", {}).get("ops", 0) == 0]
+        except OperationFailure:
+            unused = []
+
+        return {
+            "expected": expected,
+            "missing": [name for name in expected if name not in existing],
+            "unexpected": [name for name in existing if name not in expected],
+            "unused": sorted(unused)
+        }
+
     def get_next_id(self, db_name, db_collection):
         collection = self.client[db_name][db_collection]
-
-        if collection.count_documents({}) == 0:
-            return 1
-        else:
-            max_id_doc = collection.find_one({}, sort=[("id", pymongo.DESCENDING)])
-            max_id = max_id_doc["id"] if max_id_doc else 0
-            return max_id + 1
+        return self.id_allocator.next_id(collection)
 
     def add_document(self, db_name: str, collection_name: str, document: dict) -> InsertOneResult:
         db = self.client[db_name]
         collection = db[collection_name]
         document['id'] = self.get_next_id(db_name, collection_name)
-        return collection.insert_one(document)
+        document['version'] = 1
+        try:
+            return collection.insert_one(document)
+        except DuplicateKeyError:
+            # Another worker reset the counter while this one still held a block; drop it and take a fresh one.
+            self.id_allocator.discard(collection)
+            document['id'] = self.get_next_id(db_name, collection_name)
+            return collection.insert_one(document)
+
+    def add_documents(self, db_name: str, collection_name: str, documents: List[dict]) -> InsertManyResult:
+        """
+        Insert ``documents`` with one unordered insert_many, numbering them from a single contiguous id reservation.
+        A failing document does not stop the others; pymongo raises BulkWriteError listing the failed indexes.
+        """
+        if not documents:
+            # insert_many rejects an empty list
+            return InsertManyResult([], True)
+        db = self.client[db_name]
+        collection = db[collection_name]
+        for document, document_id in zip(documents, self.id_allocator.reserve_range(collection, len(documents))):
+            document['id'] = document_id
+            document['version'] = 1
+        return collection.insert_many(documents, ordered=False)
+
+    @staticmethod
+    def build_projection(fields: List[str] | None) -> Dict[str, int] | None:
+        """
+        Map requested field names to a Mongo projection. ``id`` and ``version`` are always kept since pagination,
+        lookups and ETags depend on them.
+        """
+        if fields is None:
+            return None
+        projection = {"_id": 0, "id": 1, "version": 1}
+        projection.update({field: 1 for field in fields})
+        return projection
+
+    def get_document_by_id(self, db_name: str, collection_name: str, task_id: int,
+                           fields: List[str] | None = None) -> Mapping[str, Any] | None:
+        db = self.client[db_name]
+        collection = db[collection_name]
+        return collection.find_one({"id": task_id}, projection=self.build_projection(fields))
+
+    def get_document_by_query(self, db_name: str, collection_name: str, query: dict,
+                              fields: List[str] | None = None, sort: List[Tuple[str, int]] | None = None,
+                              limit: int = 0) -> Cursor[Mapping[str, Any] | Any]:
+        db = self.client[db_name]
+        collection = db[collection_name]
+        return collection.find(query, projection=self.build_projection(fields), sort=sort, limit=limit)
+
+    def search_documents(self, db_name: str, collection_name: str, text: str, limit: int, offset: int = 0,
+                         fields: List[str] | None = None) -> list:
+        """
+        Run a $text search over title and description, best matches first (ties broken by id).
+        """
+        collection = self.client[db_name][collection_name]
+        projection = {**(self.build_projection(fields) or {}), "score": {"$meta": "textScore"}}
+        return list(collection.find({"$text": {"$search": text}}, projection=projection,
+                                    sort=[("score", {"$meta": "textScore"}), ("id", pymongo.ASCENDING)],
+                                    skip=offset, limit=limit))
+
+    def get_all_documents(self, db_name: str, collection_name: str, fields: List[str] | None = None) -> list:
+        db = self.client[db_name]
+        collection = db[collection_name]
+        return list(collection.find(projection=self.build_projection(fields)))
 
-    def get_document_by_id(self, db_name: str, collection_name: str, task_id: int) -> Mapping[str, Any] | None:
+    def aggregate(self, db_name: str, collection_name: str, pipeline: List[dict]) -> list:
+        collection = self.client[db_name][collection_name]
+        return list(collection.aggregate(pipeline))
+
+    def get_documents_page(self, db_name: str, collection_name: str, limit: int,
+                           after_id: int | None = None, fields: List[str] | None = None) -> list:
         db = self.client[db_name]
         collection = db[collection_name]
-        return collection.find_one({"id": task_id})
+        query = {} if after_id is None else {"id": {"$gt": after_id}}
+        cursor = collection.find(query, projection=self.build_projection(fields))
+        return list(cursor.sort("id", pymongo.ASCENDING).limit(limit))
+
+    @staticmethod
+    def build_versioned_update(document: dict) -> dict:
+        # "version" is owned by the store: every write bumps it, so clients can never set it directly.
+        fields = {key: value for key, value in document.items() if key != "version"}
+        update = {"$inc": {"version": 1}}
+        if fields:
+            update["$set"] = fields
+        return update
 
-    def get_document_by_query(self, db_name: str, collection_name: str, query: dict) -> Cursor[Mapping[str, Any] | Any]:
+    def update_document_by_id(self, db_name: str, collection_name: str, task_id: int, document: dict,
+                              expected_version: int | None = None) -> UpdateResult:
+        """
+        Apply ``document`` to the todo and bump its version. With ``expected_version`` the update only matches while
+        the stored version is unchanged, which makes it a compare-and-set without an extra read.
+        """
         db = self.client[db_name]
         collection = db[collection_name]
-        return collection.find(query)
+        query = {"id": task_id}
+        if expected_version is not None:
+            query["version"] = expected_version
+        return collection.update_one(query, self.build_versioned_update(document))
 
-    def get_all_documents(self, db_name: str, collection_name: str) -> list:
+    def update_documents_by_id(self, db_name: str, collection_name: str,
+                               updates: List[Tuple[int, dict]]) -> BulkWriteResult:
         db = self.client[db_name]
         collection = db[collection_name]
-        return list(collection.find())
+        operations = [UpdateOne({"id": task_id}, self.build_versioned_update(document))
+                      for task_id, document in updates]
+        return collection.bulk_write(operations, ordered=False)
 
-    def update_document_by_id(self, db_name: str, collection_name: str, task_id: int, document: dict) -> UpdateResult:
+    def delete_documents_by_id(self, db_name: str, collection_name: str, task_ids: List[int]) -> DeleteResult:
         db = self.client[db_name]
         collection = db[collection_name]
-        return collection.update_one({"id": task_id}, {"$set": document})
+        return collection.delete_many({"id": {"$in": task_ids}})
 
     def delete_document_by_id(self, db_name: str, collection_name: str, task_id: int) -> DeleteResult:
         db = self.client[db_name]
         collection = db[collection_name]
         return collection.delete_one({"id": task_id})
 
+    def delete_and_return_document_by_id(self, db_name: str, collection_name: str,
+                                         task_id: int) -> Mapping[str, Any] | None:
+        db = self.client[db_name]
+        collection = db[collection_name]
+        return collection.find_one_and_delete({"id": task_id}, projection={"_id": 0})
+
     def delete_all_documents(self, db_name: str, collection_name: str, query: dict) -> DeleteResult:
         db = self.client[db_name]
         collection = db[collection_name]
-        return collection.delete_many(query)
+        result = collection.delete_many(query)
+        if not query:
+            # An emptied collection starts numbering from 1 again, as it did before ids came from the counter.
+            self.id_allocator.reset(collection)
+        return result
@@ -0,0 +1,46 @@
+import hashlib
+
+from typing import Iterable, List, Optional
+
+
+def document_etag(document: dict, fields: Optional[List[str]] = None) -> str:
+    """
+    Strong ETag for a single todo: its id and store-maintained version, plus the projection when one was applied.
+    """
+    tag = f"{document['id']}.{document.get('version', 0)}"
+    if fields is not None:
+        tag += "." + ",".join(sorted(fields))
+    return f'"{tag}"'
+
+
+def list_etag(todos: Iterable, fields: Optional[List[str]] = None) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for todo in todos:
+        digest.update(f"{todo.id}.{todo.version};".encode())
+    if fields is not None:
+        digest.update(",".join(sorted(fields)).encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header against ``etag`` using the weak comparison RFC 9110 prescribes for it.
+    """
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return etag in [candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates]
+
+
+def version_from_etag(etag: str) -> Optional[int]:
+    """
+    Extract the version from a single-document ETag as produced by ``document_etag``; None if it is not one.
+    """
+    if etag.startswith("W/") or not (etag.startswith('"') and etag.endswith('"')):
+        return None
+    parts = etag[1:-1].split(".")
+    if len(parts) != 2 or not parts[1].isdigit():
+        return None
+    return int(parts[1])
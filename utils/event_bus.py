@@ -0,0 +1,174 @@
+import asyncio
+import threading
+
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Set
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+
+from utils.config import settings
+from utils.logger import get_logger
+from utils.responses import dumps
+
+logger = get_logger(__name__)
+
+
+class Subscription:
+    """
+    One listener's bounded queue of events, owned by the event loop that subscribed.
+
+    When the queue overflows, events are dropped and ``overflowed`` is set so the listener knows to refetch.
+    """
+
+    def __init__(self, bus: "EventBus", loop: asyncio.AbstractEventLoop, max_queue: int):
+        self.bus = bus
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.overflowed = False
+
+    def deliver(self, event: Dict[str, Any]):
+        # Always runs on self.loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> Dict[str, Any] | None:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """
+    In-process publish/subscribe channel for todo mutations.
+
+    ``publish`` may be called from any thread; each event gets an increasing id and is handed to every subscriber's
+    event loop. The last ``history_size`` events are kept so a reconnecting client can resume from its last id.
+    """
+
+    def __init__(self, history_size: int = 1000, max_queue: int = 1000):
+        self.max_queue = max_queue
+        self._history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self._subscribers: Set[Subscription] = set()
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def publish(self, event_type: str, todo_id: int | None = None, data: Dict[str, Any] | None = None) -> dict:
+        with self._lock:
+            self._sequence += 1
+            event = {"id": self._sequence, "type": event_type, "todo_id": todo_id, "data": data}
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's loop is closed; it can no longer receive anything
+                self.unsubscribe(subscription)
+        return event
+
+    def subscribe(self, last_event_id: int | None = None) -> Subscription:
+        """
+        Register a listener on the running event loop, first replaying the kept events after ``last_event_id``.
+        """
+        subscription = Subscription(self, asyncio.get_running_loop(), self.max_queue)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if last_event_id is not None:
+                oldest = self._history[0]["id"] if self._history else self._sequence + 1
+                # Events between the client's last id and the oldest kept one are gone
+                subscription.overflowed = last_event_id < oldest - 1
+                for event in self._history:
+                    if event["id"] > last_event_id:
+                        subscription.deliver(event)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+def format_sse(event: Dict[str, Any]) -> bytes:
+    return b"id: %d\nevent: %s\ndata: %s\n\n" % (event["id"], event["type"].encode(), dumps(event))
+
+
+async def sse_stream(subscription: Subscription, heartbeat_seconds: float) -> AsyncIterator[bytes]:
+    """
+    Yield server-sent events for ``subscription`` until the client goes away, with a comment line every
+    ``heartbeat_seconds`` of silence so proxies keep the connection open.
+    """
+    try:
+        while True:
+            if subscription.overflowed:
+                subscription.overflowed = False
+                yield b"event: resync\ndata: {}\n\n"
+            event = await subscription.get(heartbeat_seconds)
+            yield b": keep-alive\n\n" if event is None else format_sse(event)
+    finally:
+        subscription.close()
+
+
+class ChangeStreamFeeder:
+    """
+    Publishes the collection's Mongo change stream onto an EventBus, so writes made by any API node reach every
+    node's subscribers. Needs a replica set or sharded cluster.
+
+    Delete events only carry the Mongo ``_id``, as the deleted document is not available to the stream.
+    """
+
+    operation_types = {"insert": "created", "update": "updated", "replace": "updated", "delete": "deleted",
+                       "drop": "cleared"}
+
+    def __init__(self, bus: EventBus, collection: Collection, max_await_time_ms: int = 1000):
+        self.bus = bus
+        self.collection = collection
+        self.max_await_time_ms = max_await_time_ms
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="todo-change-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.max_await_time_ms / 1000 + 1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                with self.collection.watch(full_document="updateLookup",
+                                           max_await_time_ms=self.max_await_time_ms) as stream:
+                    while not self._stopped.is_set():
+                        change = stream.try_next()
+                        if change is not None:
+                            self.publish(change)
+            except PyMongoError as e:
+                logger.warning("Change stream failed, reconnecting", extra={"error": str(e)})
+                self._stopped.wait(1.0)
+
+    def publish(self, change: Dict[str, Any]):
+        event_type = self.operation_types.get(change.get("operationType"))
+        if event_type is None:
+            return
+        document = change.get("fullDocument") or {}
+        data = {key: value for key, value in document.items() if key not in ("_id", "version")} or None
+        if event_type == "deleted":
+            data = {"oid": change.get("documentKey", {}).get("_id")}
+        self.bus.publish(event_type, document.get("id"), data)
+
+
+event_bus = EventBus(settings.event_history_size, settings.event_queue_size)
@@ -0,0 +1,84 @@
+import threading
+
+import pymongo
+
+from typing import Dict, Tuple
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+
+from utils.config import settings
+
+
+class IdAllocator:
+    """
+    Hands out sequential todo ids from an atomic counter document.
+
+    Each (database, collection) pair has a counter stored in the ``counters`` collection of the same database.
+    A process reserves ``block_size`` ids at a time with a single ``find_one_and_update`` + ``$inc`` and then
+    serves them from memory, so concurrent workers never receive the same id.
+    """
+
+    COUNTERS_COLLECTION = "counters"
+
+    def __init__(self, block_size: int = 100):
+        if block_size < 1:
+            raise ValueError("block_size must be a positive integer")
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._blocks: Dict[Tuple[str, str], Tuple[int, int]] = {}
+        self._seeded: set = set()
+
+    def next_id(self, collection: Collection) -> int:
+        key = (collection.database.name, collection.name)
+        with self._lock:
+            next_id, last_id = self._blocks.get(key, (1, 0))
+            if next_id > last_id:
+                next_id, last_id = self._reserve(collection, self.block_size)
+            self._blocks[key] = (next_id + 1, last_id)
+            return next_id
+
+    def reserve_range(self, collection: Collection, count: int) -> range:
+        if count < 1:
+            return range(0)
+        with self._lock:
+            first_id, last_id = self._reserve(collection, count)
+            return range(first_id, last_id + 1)
+
+    def discard(self, collection: Collection):
+        key = (collection.database.name, collection.name)
+        with self._lock:
+            self._blocks.pop(key, None)
+
+    def reset(self, collection: Collection):
+        key = (collection.database.name, collection.name)
+        with self._lock:
+            collection.database[self.COUNTERS_COLLECTION].delete_one({"_id": collection.name})
+            self._blocks.pop(key, None)
+            self._seeded.discard(key)
+
+    def _reserve(self, collection: Collection, count: int) -> Tuple[int, int]:
+        counters = collection.database[self.COUNTERS_COLLECTION]
+        key = (collection.database.name, collection.name)
+        if key not in self._seeded:
+            self._seed(collection, counters)
+            self._seeded.add(key)
+
+        counter = counters.find_one_and_update(
+            {"_id": collection.name},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        last_id = counter["seq"]
+        return last_id - count + 1, last_id
+
+    @staticmethod
+    def _seed(collection: Collection, counters: Collection):
+        # Collections that predate the counter already hold ids; "$max" only ever moves the counter forward,
+        # so every worker can run this once without racing the others.
+        max_id_doc = collection.find_one({}, sort=[("id", pymongo.DESCENDING)], projection={"id": 1})
+        max_id = max_id_doc["id"] if max_id_doc and isinstance(max_id_doc.get("id"), int) else 0
+        counters.update_one({"_id": collection.name}, {"$max": {"seq": max_id}}, upsert=True)
+
+
+id_allocator = IdAllocator(settings.id_block_size)
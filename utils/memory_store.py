@@ -0,0 +1,497 @@
+import bisect
+import operator
+import re
+import threading
+
+from collections import Counter, defaultdict
+
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Tuple
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import UpdateResult, InsertOneResult, InsertManyResult, DeleteResult, BulkWriteResult
+
+from utils.db_store import ToDoDBStore
+
+
+def _compare(compare: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    def apply(value, operand):
+        try:
+            return value is not None and compare(value, operand)
+        except TypeError:
+            return False
+
+    return apply
+
+
+def _regex(value, operand, options: str = "") -> bool:
+    if not isinstance(value, str):
+        return False
+    if isinstance(operand, re.Pattern):
+        return operand.search(value) is not None
+    flags = re.IGNORECASE if "i" in options else 0
+    return re.search(operand, value, flags) is not None
+
+
+_OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$eq": operator.eq,
+    "$ne": operator.ne,
+    "$gt": _compare(operator.gt),
+    "$gte": _compare(operator.ge),
+    "$lt": _compare(operator.lt),
+    "$lte": _compare(operator.le),
+    "$in": lambda value, operand: value in operand,
+    "$nin": lambda value, operand: value not in operand,
+    "$exists": lambda value, operand: (value is not None) == bool(operand),
+}
+
+
+# For each id range operator: which bisect finds the boundary and whether it bounds the start or the end
+_ID_RANGE_BOUNDS: Dict[str, Tuple[str, str]] = {
+    "$gt": ("right", "start"),
+    "$gte": ("left", "start"),
+    "$lt": ("left", "end"),
+    "$lte": ("right", "end"),
+}
+
+
+def matches(document: Mapping[str, Any], query: Mapping[str, Any]) -> bool:
+    """
+    Evaluate the subset of the Mongo query language the services use: field equality, comparison operators,
+    $in/$nin/$exists/$regex and top-level $and/$or.
+    """
+    for field, condition in query.items():
+        if field == "$and":
+            if not all(matches(document, sub_query) for sub_query in condition):
+                return False
+            continue
+        if field == "$or":
+            if not any(matches(document, sub_query) for sub_query in condition):
+                return False
+            continue
+
+        value = document.get(field)
+        if isinstance(condition, dict) and condition and all(key.startswith("$") for key in condition):
+            for operator_name, operand in condition.items():
+                if operator_name == "$options":
+                    continue
+                if operator_name == "$regex":
+                    if not _regex(value, operand, condition.get("$options", "")):
+                        return False
+                elif not _OPERATORS[operator_name](value, operand):
+                    return False
+        elif isinstance(condition, re.Pattern):
+            if not _regex(value, condition):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _sort_key(value) -> tuple:
+    # Mongo orders missing/null values before everything else
+    return (value is not None, value if value is not None else 0)
+
+
+def sort_documents(documents: List[dict], keys: List[Tuple[str, int]]):
+    # Stable sorts applied from the last key to the first give the compound order
+    for field, direction in reversed(keys):
+        documents.sort(key=lambda document: _sort_key(document.get(field)), reverse=direction < 0)
+
+
+_EXPRESSIONS: Dict[str, Callable[[Any, Any], Any]] = {
+    "$add": operator.add,
+    "$subtract": operator.sub,
+    "$multiply": operator.mul,
+    "$mod": operator.mod,
+}
+
+
+def evaluate(expression, document: Mapping[str, Any]):
+    """
+    Evaluate an aggregation expression: "$field" paths, literals, documents of expressions and the binary
+    arithmetic operators in _EXPRESSIONS. Arithmetic on a missing value gives None, as in Mongo.
+    """
+    if isinstance(expression, str) and expression.startswith("$"):
+        return document.get(expression[1:])
+    if isinstance(expression, dict):
+        if len(expression) == 1 and next(iter(expression)) in _EXPRESSIONS:
+            name, operands = next(iter(expression.items()))
+            values = [evaluate(operand, document) for operand in operands]
+            return None if any(value is None for value in values) else _EXPRESSIONS[name](*values)
+        return {key: evaluate(value, document) for key, value in expression.items()}
+    return expression
+
+
+def _sum(current, value):
+    # Like Mongo, $sum skips non-numeric values
+    number = value if isinstance(value, (int, float)) and not isinstance(value, bool) else 0
+    return (current or 0) + number
+
+
+_ACCUMULATORS: Dict[str, Callable[[Any, Any], Any]] = {
+    "$sum": _sum,
+    "$min": lambda current, value: value if current is None or (value is not None and value < current) else current,
+    "$max": lambda current, value: value if current is None or (value is not None and value > current) else current,
+}
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return tuple((key, _hashable(item)) for key, item in value.items())
+    return value
+
+
+def _group(documents: List[Mapping[str, Any]], spec: Dict[str, Any]) -> List[dict]:
+    groups: Dict[Any, dict] = {}
+    accumulators = [(field, *next(iter(accumulator.items()))) for field, accumulator in spec.items() if field != "_id"]
+    for document in documents:
+        group_id = evaluate(spec["_id"], document)
+        group = groups.get(_hashable(group_id))
+        if group is None:
+            group = groups[_hashable(group_id)] = {"_id": group_id, **{field: None for field, _, _ in accumulators}}
+        for field, name, operand in accumulators:
+            group[field] = _ACCUMULATORS[name](group[field], evaluate(operand, document))
+    return list(groups.values())
+
+
+def aggregate_documents(documents: List[Mapping[str, Any]], pipeline: List[Dict[str, Any]]) -> List[dict]:
+    """
+    Run the subset of the aggregation framework the services use: $match, $group (with $sum/$min/$max), $sort,
+    $limit, $count and $facet.
+    """
+    for stage in pipeline:
+        name, spec = next(iter(stage.items()))
+        if name == "$match":
+            documents = [document for document in documents if matches(document, spec)]
+        elif name == "$group":
+            documents = _group(documents, spec)
+        elif name == "$sort":
+            documents = list(documents)
+            sort_documents(documents, list(spec.items()))
+        elif name == "$limit":
+            documents = documents[:spec]
+        elif name == "$count":
+            documents = [{spec: len(documents)}]
+        elif name == "$facet":
+            documents = [{facet: aggregate_documents(documents, sub_pipeline) for facet, sub_pipeline in spec.items()}]
+        else:
+            raise NotImplementedError(f"Aggregation stage {name} is not supported by the in-memory engine")
+    return [dict(document) for document in documents]
+
+
+def project(document: Mapping[str, Any], projection: Dict[str, int] | None) -> dict:
+    if projection is None:
+        return dict(document)
+    result = {field: document[field] for field, include in projection.items()
+              if include and field != "_id" and field in document}
+    if projection.get("_id", 1):
+        result["_id"] = document["_id"]
+    return result
+
+
+class MemoryCursor:
+    """
+    Minimal stand-in for pymongo's Cursor over a snapshot of matching documents.
+    """
+
+    def __init__(self, documents: List[dict]):
+        self._documents = documents
+        self._iterator: Iterator[dict] | None = None
+
+    def sort(self, key: str | List[Tuple[str, int]], direction: int = 1) -> "MemoryCursor":
+        sort_documents(self._documents, [(key, direction)] if isinstance(key, str) else key)
+        return self
+
+    def limit(self, limit: int) -> "MemoryCursor":
+        if limit:
+            self._documents = self._documents[:limit]
+        return self
+
+    def batch_size(self, batch_size: int) -> "MemoryCursor":
+        return self
+
+    def close(self):
+        self._documents = []
+        self._iterator = iter(())
+
+    def __iter__(self) -> "MemoryCursor":
+        return self
+
+    def __next__(self) -> dict:
+        if self._iterator is None:
+            self._iterator = iter(self._documents)
+        return next(self._iterator)
+
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text) -> List[str]:
+    return _TOKEN.findall(text.lower()) if isinstance(text, str) else []
+
+
+class MemoryCollection:
+    def __init__(self, text_weights: Dict[str, int] | None = None):
+        self.documents: Dict[int, dict] = {}
+        # Kept sorted so id range scans are a bisect plus a slice, like a walk over Mongo's id index
+        self.ids: List[int] = []
+        self.last_id = 0
+        # Inverted index standing in for a Mongo text index: token -> {id: weighted term frequency}
+        self.text_weights = text_weights or {}
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+
+    def insert(self, document: dict):
+        if document["id"] in self.documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error dup key: {{ id: {document['id']} }}")
+        self.documents[document["id"]] = document
+        bisect.insort(self.ids, document["id"])
+        self._index_text(document)
+
+    def replace(self, document: dict):
+        self._unindex_text(self.documents[document["id"]])
+        self.documents[document["id"]] = document
+        self._index_text(document)
+
+    def remove(self, task_id: int) -> dict | None:
+        document = self.documents.pop(task_id, None)
+        if document is not None:
+            del self.ids[bisect.bisect_left(self.ids, task_id)]
+            self._unindex_text(document)
+        return document
+
+    def _index_text(self, document: dict):
+        for field, weight in self.text_weights.items():
+            tokens = tokenize(document.get(field))
+            for token, count in Counter(tokens).items():
+                postings = self.postings[token]
+                postings[document["id"]] = postings.get(document["id"], 0.0) + weight * count / len(tokens)
+
+    def _unindex_text(self, document: dict):
+        for token in {token for field in self.text_weights for token in tokenize(document.get(field))}:
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(document["id"], None)
+                if not postings:
+                    del self.postings[token]
+
+    def search(self, text: str) -> List[Tuple[int, float]]:
+        """
+        (id, score) of every document containing any token of ``text``, best first; ties go to the lower id.
+        """
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokenize(text)):
+            for task_id, score in self.postings.get(token, {}).items():
+                scores[task_id] += score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def ordered(self) -> Iterator[dict]:
+        return (self.documents[task_id] for task_id in self.ids)
+
+    def id_range(self, bounds: Dict[str, int]) -> List[int]:
+        """
+        The ids within the $gt/$gte/$lt/$lte ``bounds``, found by bisecting the sorted id list.
+        """
+        start, end = 0, len(self.ids)
+        for operator_name, bound in bounds.items():
+            side, offset = _ID_RANGE_BOUNDS[operator_name]
+            position = (bisect.bisect_left if side == "left" else bisect.bisect_right)(self.ids, bound)
+            if offset == "start":
+                start = max(start, position)
+            else:
+                end = min(end, position)
+        return self.ids[start:end]
+
+
+_shared_databases: Dict[Tuple[str, str], MemoryCollection] = {}
+_shared_lock = threading.RLock()
+
+
+class InMemoryToDoDBStore:
+    """
+    Process-local storage engine with the same surface and result types as ToDoDBStore.
+
+    Documents live in a dict keyed by id next to a sorted id list, so point reads are O(1) and paging is O(page).
+    Every instance shares one process-wide dataset unless it is given its own ``collections`` mapping.
+    """
+
+    index_registry = ToDoDBStore.index_registry
+    build_projection = staticmethod(ToDoDBStore.build_projection)
+    initialize_db = ToDoDBStore.initialize_db
+
+    def __init__(self, collections: Dict[Tuple[str, str], MemoryCollection] | None = None):
+        if collections is None:
+            self.collections = _shared_databases
+            self._lock = _shared_lock
+        else:
+            self.collections = collections
+            self._lock = threading.RLock()
+
+    def _collection(self, db_name: str, collection_name: str) -> MemoryCollection:
+        key = (db_name, collection_name)
+        if key not in self.collections:
+            self.collections[key] = MemoryCollection(self._text_weights(collection_name))
+        return self.collections[key]
+
+    def _text_weights(self, collection_name: str) -> Dict[str, int]:
+        for index in self.index_registry.get(collection_name, []):
+            if "weights" in index.document:
+                return dict(index.document["weights"])
+        return {}
+
+    def ensure_indexes(self, db_name: str, collection_name: str) -> List[str]:
+        return [index.document["name"] for index in self.index_registry.get(collection_name, [])]
+
+    def check_indexes(self, db_name: str, collection_name: str) -> Dict[str, List[str]]:
+        return {
+            "expected": self.ensure_indexes(db_name, collection_name),
+            "missing": [],
+            "unexpected": [],
+            "unused": []
+        }
+
+    def get_next_id(self, db_name, db_collection) -> int:
+        with self._lock:
+            collection = self._collection(db_name, db_collection)
+            collection.last_id += 1
+            return collection.last_id
+
+    def add_document(self, db_name: str, collection_name: str, document: dict) -> InsertOneResult:
+        with self._lock:
+            collection = self._collection(db_name, collection_name)
+            document['id'] = self.get_next_id(db_name, collection_name)
+            document['version'] = 1
+            document.setdefault('_id', ObjectId())
+            collection.insert(dict(document))
+            return InsertOneResult(document['_id'], True)
+
+    def add_documents(self, db_name: str, collection_name: str, documents: List[dict]) -> InsertManyResult:
+        with self._lock:
+            for document in documents:
+                self.add_document(db_name, collection_name, document)
+            return InsertManyResult([document['_id'] for document in documents], True)
+
+    def get_document_by_id(self, db_name: str, collection_name: str, task_id: int,
+                           fields: List[str] | None = None) -> Mapping[str, Any] | None:
+        with self._lock:
+            document = self._collection(db_name, collection_name).documents.get(task_id)
+            return None if document is None else project(document, self.build_projection(fields))
+
+    def get_document_by_query(self, db_name: str, collection_name: str, query: dict,
+                              fields: List[str] | None = None, sort: List[Tuple[str, int]] | None = None,
+                              limit: int = 0) -> MemoryCursor:
+        projection = self.build_projection(fields)
+        with self._lock:
+            collection = self._collection(db_name, collection_name)
+            id_condition = query.get("id")
+            if isinstance(id_condition, int):
+                candidates = [collection.documents[id_condition]] if id_condition in collection.documents else []
+            elif isinstance(id_condition, dict) and id_condition and set(id_condition) <= set(_ID_RANGE_BOUNDS) \
+                    and all(isinstance(bound, int) for bound in id_condition.values()):
+                candidates = (collection.documents[task_id] for task_id in collection.id_range(id_condition))
+            else:
+                candidates = collection.ordered()
+            matched = [document for document in candidates if matches(document, query)]
+            if sort:
+                sort_documents(matched, sort)
+            if limit:
+                matched = matched[:limit]
+            return MemoryCursor([project(document, projection) for document in matched])
+
+    def get_all_documents(self, db_name: str, collection_name: str, fields: List[str] | None = None) -> list:
+        projection = self.build_projection(fields)
+        with self._lock:
+            return [project(document, projection) for document in self._collection(db_name, collection_name).ordered()]
+
+    def aggregate(self, db_name: str, collection_name: str, pipeline: List[dict]) -> list:
+        with self._lock:
+            documents = list(self._collection(db_name, collection_name).ordered())
+        # Stored documents are replaced rather than mutated on update, so the snapshot can be read without the lock
+        return aggregate_documents(documents, pipeline)
+
+    def get_documents_page(self, db_name: str, collection_name: str, limit: int,
+                           after_id: int | None = None, fields: List[str] | None = None) -> list:
+        projection = self.build_projection(fields)
+        with self._lock:
+            collection = self._collection(db_name, collection_name)
+            start = 0 if after_id is None else bisect.bisect_right(collection.ids, after_id)
+            return [project(collection.documents[task_id], projection)
+                    for task_id in collection.ids[start:start + limit]]
+
+    def search_documents(self, db_name: str, collection_name: str, text: str, limit: int, offset: int = 0,
+                         fields: List[str] | None = None) -> list:
+        """
+        Rank documents with the collection's inverted index. Scores approximate Mongo's textScore (weighted term
+        frequency, no stemming or stop words) and only their order is meant to match.
+        """
+        projection = self.build_projection(fields)
+        with self._lock:
+            collection = self._collection(db_name, collection_name)
+            ranked = collection.search(text)[offset:offset + limit]
+            return [{**project(collection.documents[task_id], projection), "score": score}
+                    for task_id, score in ranked]
+
+    def _update(self, collection: MemoryCollection, task_id: int, document: dict,
+                expected_version: int | None = None) -> bool:
+        current = collection.documents.get(task_id)
+        if current is None or (expected_version is not None and current.get("version") != expected_version):
+            return False
+        updated = {**current, **{key: value for key, value in document.items() if key != "version"}}
+        updated["version"] = current.get("version", 0) + 1
+        if updated["id"] != task_id:
+            if updated["id"] in collection.documents:
+                raise DuplicateKeyError(f"E11000 duplicate key error dup key: {{ id: {updated['id']} }}")
+            collection.remove(task_id)
+            collection.insert(updated)
+        else:
+            collection.replace(updated)
+        return True
+
+    def update_document_by_id(self, db_name: str, collection_name: str, task_id: int, document: dict,
+                              expected_version: int | None = None) -> UpdateResult:
+        with self._lock:
+            updated = self._update(self._collection(db_name, collection_name), task_id, document, expected_version)
+            return UpdateResult({"n": int(updated), "nModified": int(updated)}, True)
+
+    def update_documents_by_id(self, db_name: str, collection_name: str,
+                               updates: List[Tuple[int, dict]]) -> BulkWriteResult:
+        with self._lock:
+            collection = self._collection(db_name, collection_name)
+            updated, write_errors = 0, []
+            # Like an unordered bulk_write: a failing update does not stop the others and is reported afterwards
+            for index, (task_id, document) in enumerate(updates):
+                try:
+                    updated += self._update(collection, task_id, document)
+                except DuplicateKeyError as e:
+                    write_errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+            details = {"nInserted": 0, "nUpserted": 0, "nMatched": updated, "nModified": updated, "nRemoved": 0,
+                       "upserted": [], "writeErrors": write_errors}
+            if write_errors:
+                raise BulkWriteError(details)
+            return BulkWriteResult(details, True)
+
+    def delete_documents_by_id(self, db_name: str, collection_name: str, task_ids: List[int]) -> DeleteResult:
+        with self._lock:
+            collection = self._collection(db_name, collection_name)
+            deleted = [collection.remove(task_id) for task_id in set(task_ids)]
+            return DeleteResult({"n": sum(document is not None for document in deleted)}, True)
+
+    def delete_document_by_id(self, db_name: str, collection_name: str, task_id: int) -> DeleteResult:
+        with self._lock:
+            deleted = self._collection(db_name, collection_name).remove(task_id)
+            return DeleteResult({"n": int(deleted is not None)}, True)
+
+    def delete_and_return_document_by_id(self, db_name: str, collection_name: str,
+                                         task_id: int) -> Mapping[str, Any] | None:
+        with self._lock:
+            deleted = self._collection(db_name, collection_name).remove(task_id)
+            return None if deleted is None else {key: value for key, value in deleted.items() if key != "_id"}
+
+    def delete_all_documents(self, db_name: str, collection_name: str, query: dict) -> DeleteResult:
+        with self._lock:
+            collection = self._collection(db_name, collection_name)
+            task_ids = [document["id"] for document in collection.ordered() if matches(document, query)]
+            for task_id in task_ids:
+                collection.remove(task_id)
+            if not query:
+                collection.last_id = 0
+            return DeleteResult({"n": len(task_ids)}, True)
@@ -0,0 +1,417 @@
+import bisect
+import functools
+import threading
+import time
+
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 10000, 100000)
+
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = value
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # One slot per bucket plus the +Inf overflow; counts are per bucket and only made cumulative when rendered
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Metric:
+    """
+    A named metric family; ``labels(...)`` returns the child that holds the value for one label combination.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self.labels().dec(amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def _render_child(self, values: Tuple[str, ...], child: _HistogramChild) -> List[str]:
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Holds every metric family and renders them in the Prometheus text exposition format (version 0.0.4).
+    """
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_total = registry.counter(
+    "todo_http_requests_total", "HTTP requests handled, by method, route template and status.",
+    ("method", "route", "status"))
+http_request_errors_total = registry.counter(
+    "todo_http_request_errors_total", "HTTP requests answered with a 4xx or 5xx status.", ("method", "route", "status"))
+http_request_duration_seconds = registry.histogram(
+    "todo_http_request_duration_seconds", "Time spent handling an HTTP request.", ("method", "route"))
+http_requests_in_flight = registry.gauge(
+    "todo_http_requests_in_flight", "HTTP requests currently being handled.")
+db_operation_duration_seconds = registry.histogram(
+    "todo_db_operation_duration_seconds", "Time spent in a storage engine call.", ("operation",))
+db_operation_errors_total = registry.counter(
+    "todo_db_operation_errors_total", "Storage engine calls that raised.", ("operation",))
+db_documents_returned = registry.histogram(
+    "todo_db_documents_returned", "Documents returned by a storage list call.", ("operation",), SIZE_BUCKETS)
+mongo_pool_checkout_wait_seconds = registry.histogram(
+    "todo_mongo_pool_checkout_wait_seconds", "Time spent waiting to check a connection out of the Mongo pool.")
+mongo_pool_checkout_failures_total = registry.counter(
+    "todo_mongo_pool_checkout_failures_total", "Connection checkouts that failed, by reason.", ("reason",))
+single_flight_calls_total = registry.counter(
+    "todo_single_flight_calls_total", "Coalescable reads that ran their own storage call.", ("operation",))
+single_flight_shared_total = registry.counter(
+    "todo_single_flight_shared_total", "Reads answered by joining an identical in-flight call.", ("operation",))
+
+
+class InstrumentedCursor:
+    """
+    Iterates a cursor returned by an instrumented call, adding the time spent fetching from it to the call's duration.
+
+    A cursor only runs its query while it is iterated, so the call is observed once it is exhausted, fails or is
+    closed, with the number of documents it yielded. Chained modifiers such as ``batch_size`` keep the wrapper.
+    """
+
+    def __init__(self, cursor, elapsed: float, duration: _HistogramChild, errors: _CounterChild,
+                 documents: _HistogramChild):
+        self._cursor = cursor
+        self._elapsed = elapsed
+        self._duration = duration
+        self._errors = errors
+        self._documents = documents
+        self._returned = 0
+        self._finished = False
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._cursor, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def call(*args, **kwargs):
+            result = attribute(*args, **kwargs)
+            return self if result is self._cursor else result
+
+        return call
+
+    def __iter__(self) -> "InstrumentedCursor":
+        return self
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            document = next(self._cursor)
+        except StopIteration:
+            self._elapsed += time.perf_counter() - started
+            self._finish()
+            raise
+        except Exception:
+            self._elapsed += time.perf_counter() - started
+            self._errors.inc()
+            self._finish()
+            raise
+        self._elapsed += time.perf_counter() - started
+        self._returned += 1
+        return document
+
+    def close(self):
+        self._cursor.close()
+        self._finish()
+
+    def _finish(self):
+        if not self._finished:
+            self._finished = True
+            self._duration.observe(self._elapsed)
+            self._documents.observe(self._returned)
+
+
+class InstrumentedStore:
+    """
+    Wraps a storage engine so every call is timed, counted when it raises, and, for calls that return a list,
+    has its result size recorded. Calls returning a cursor are wrapped in an ``InstrumentedCursor`` and observed
+    once the cursor has been drained or closed, so their duration covers fetching the documents too.
+
+    Wrapped methods are cached on the instance, so after the first call a lookup costs the same as on the engine.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self.store, name)
+        if not callable(attribute) or name.startswith("_"):
+            return attribute
+        wrapped = self._instrument(name, attribute)
+        setattr(self, name, wrapped)
+        return wrapped
+
+    @staticmethod
+    def _instrument(name: str, method: Callable) -> Callable:
+        duration = db_operation_duration_seconds.labels(name)
+        errors = db_operation_errors_total.labels(name)
+        documents = db_documents_returned.labels(name)
+
+        @functools.wraps(method)
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                duration.observe(time.perf_counter() - started)
+                raise
+            elapsed = time.perf_counter() - started
+            if hasattr(result, "__next__"):
+                return InstrumentedCursor(result, elapsed, duration, errors, documents)
+            duration.observe(elapsed)
+            if isinstance(result, list):
+                documents.observe(len(result))
+            return result
+
+        return call
+
+
+class PoolCheckoutListener(monitoring.ConnectionPoolListener):
+    """
+    Records how long each thread waits for a pooled Mongo connection; a growing wait means maxPoolSize is too small
+    for the request concurrency.
+    """
+
+    def __init__(self):
+        self._started = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._started.at = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        self._observe()
+
+    def connection_check_out_failed(self, event):
+        self._observe()
+        mongo_pool_checkout_failures_total.labels(str(event.reason)).inc()
+
+    def _observe(self):
+        started = getattr(self._started, "at", None)
+        if started is not None:
+            mongo_pool_checkout_wait_seconds.observe(time.perf_counter() - started)
+            self._started.at = None
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+
+pool_listener = PoolCheckoutListener()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request count, errors by status, latency and in-flight requests per route template.
+
+    Requests that match no route are labelled "unmatched" so arbitrary paths cannot blow up label cardinality.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[Callable, str] | None = None
+
+    def _route_path(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._route_paths is None:
+            application = scope.get("app")
+            self._route_paths = {route.endpoint: route.path for route in getattr(application, "routes", [])
+                                 if hasattr(route, "endpoint")}
+        return self._route_paths.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+        http_requests_in_flight.inc()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            method, route = scope["method"], self._route_path(scope)
+            http_request_duration_seconds.labels(method, route).observe(time.perf_counter() - started)
+            http_requests_total.labels(method, route, str(status)).inc()
+            if status >= 400:
+                http_request_errors_total.labels(method, route, str(status)).inc()
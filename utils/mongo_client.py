@@ -0,0 +1,49 @@
+import threading
+
+from pymongo import MongoClient
+
+from utils.config import Settings, settings
+from utils.metrics import pool_listener
+
+_client: MongoClient | None = None
+_client_lock = threading.Lock()
+
+
+def create_client(config: Settings) -> MongoClient:
+    write_concern = int(config.mongo_write_concern) if config.mongo_write_concern.isdigit() \
+        else config.mongo_write_concern
+    return MongoClient(
+        config.mongo_uri,
+        maxPoolSize=config.mongo_max_pool_size,
+        minPoolSize=config.mongo_min_pool_size,
+        connectTimeoutMS=config.mongo_connect_timeout_ms,
+        serverSelectionTimeoutMS=config.mongo_server_selection_timeout_ms,
+        socketTimeoutMS=config.mongo_socket_timeout_ms,
+        waitQueueTimeoutMS=config.mongo_wait_queue_timeout_ms,
+        readPreference=config.mongo_read_preference,
+        w=write_concern,
+        event_listeners=[pool_listener]
+    )
+
+
+def open_client(config: Settings | None = None) -> MongoClient:
+    """
+    Return the process-wide MongoClient, creating it from the given settings (or the environment) on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = create_client(config or settings)
+        return _client
+
+
+def get_client() -> MongoClient:
+    return _client or open_client()
+
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
@@ -0,0 +1,32 @@
+import orjson
+
+from typing import Any
+from bson import ObjectId
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode ``content`` to compact JSON bytes with orjson.
+
+    ObjectIds are written as their hex string and pydantic models as their JSON dump.
+    """
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered by ``dumps``; the todo router's default response class.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from utils.config import settings
+from utils.metrics import single_flight_calls_total, single_flight_shared_total
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Lets concurrent identical reads share one in-flight call: while a call for a key is running, later callers with
+    the same key wait for its result (or exception) instead of issuing their own.
+
+    ``do`` coalesces across threads and ``do_async`` across tasks of one event loop. Keys are tuples whose first
+    item names the operation; ``calls``/``shared`` count executed and saved calls per operation in the
+    ``todo_single_flight_*`` metrics and in ``stats()``.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.shared = 0
+
+    def _count(self, key: Hashable, shared: bool):
+        if shared:
+            self.shared += 1
+            single_flight_shared_total.labels(str(key[0])).inc()
+        else:
+            self.calls += 1
+            single_flight_calls_total.labels(str(key[0])).inc()
+
+    def do(self, key: Hashable, call: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            shared = future is not None
+            if not shared:
+                future = self._calls[key] = Future()
+            self._count(key, shared)
+        if shared:
+            return future.result()
+
+        try:
+            result = call()
+        except BaseException as e:
+            self._finish(self._calls, key, future)
+            future.set_exception(e)
+            raise
+        self._finish(self._calls, key, future)
+        future.set_result(result)
+        return result
+
+    async def do_async(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._tasks.get(key)
+            shared = task is not None and task.get_loop() is loop and not task.done()
+            if not shared:
+                task = self._tasks[key] = loop.create_task(call())
+                task.add_done_callback(lambda done: self._finish(self._tasks, key, done))
+            self._count(key, shared)
+        # Shielded, so one caller going away does not cancel the call the others are waiting on
+        return await asyncio.shield(task)
+
+    def _finish(self, calls: Dict[Hashable, Any], key: Hashable, call: Any):
+        with self._lock:
+            if calls.get(key) is call:
+                del calls[key]
+
+    def forget(self, predicate: Callable[[Hashable], bool] | None = None):
+        """
+        Stop handing the in-flight calls matching ``predicate`` (all of them when None) to new callers, e.g. after
+        a write they may have been too early to see. Callers already waiting still get their result.
+        """
+        with self._lock:
+            for calls in (self._calls, self._tasks):
+                for key in [key for key in calls if predicate is None or predicate(key)]:
+                    del calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests = self.calls + self.shared
+            return {
+                "in_flight": len(self._calls) + len(self._tasks),
+                "calls": self.calls,
+                "shared": self.shared,
+                "shared_ratio": self.shared / requests if requests else 0.0
+            }
+
+
+def single_flight_from_settings() -> SingleFlight | None:
+    if not settings.single_flight_enabled:
+        return None
+    return SingleFlight()
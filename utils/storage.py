@@ -0,0 +1,71 @@
+from typing import Any, Dict, Iterable, List, Mapping, Protocol, Tuple
+from pymongo.results import UpdateResult, InsertOneResult, InsertManyResult, DeleteResult, BulkWriteResult
+
+from utils.config import settings
+from utils.db_store import ToDoDBStore
+from utils.memory_store import InMemoryToDoDBStore
+from utils.metrics import InstrumentedStore
+
+
+class ToDoStorage(Protocol):
+    """
+    The storage surface the services depend on. ToDoDBStore (MongoDB) and InMemoryToDoDBStore implement it; results
+    use pymongo's result types so callers do not care which engine answered.
+    """
+
+    def initialize_db(self, db_name: str, db_collection: str): ...
+
+    def ensure_indexes(self, db_name: str, collection_name: str) -> List[str]: ...
+
+    def check_indexes(self, db_name: str, collection_name: str) -> Dict[str, List[str]]: ...
+
+    def get_next_id(self, db_name, db_collection) -> int: ...
+
+    def add_document(self, db_name: str, collection_name: str, document: dict) -> InsertOneResult: ...
+
+    def add_documents(self, db_name: str, collection_name: str, documents: List[dict]) -> InsertManyResult: ...
+
+    def get_document_by_id(self, db_name: str, collection_name: str, task_id: int,
+                           fields: List[str] | None = None) -> Mapping[str, Any] | None: ...
+
+    def get_document_by_query(self, db_name: str, collection_name: str, query: dict,
+                              fields: List[str] | None = None, sort: List[Tuple[str, int]] | None = None,
+                              limit: int = 0) -> Iterable[Mapping[str, Any]]: ...
+
+    def search_documents(self, db_name: str, collection_name: str, text: str, limit: int, offset: int = 0,
+                         fields: List[str] | None = None) -> list: ...
+
+    def get_all_documents(self, db_name: str, collection_name: str, fields: List[str] | None = None) -> list: ...
+
+    def aggregate(self, db_name: str, collection_name: str, pipeline: List[dict]) -> list: ...
+
+    def get_documents_page(self, db_name: str, collection_name: str, limit: int,
+                           after_id: int | None = None, fields: List[str] | None = None) -> list: ...
+
+    def update_document_by_id(self, db_name: str, collection_name: str, task_id: int, document: dict,
+                              expected_version: int | None = None) -> UpdateResult: ...
+
+    def update_documents_by_id(self, db_name: str, collection_name: str,
+                               updates: List[Tuple[int, dict]]) -> BulkWriteResult: ...
+
+    def delete_documents_by_id(self, db_name: str, collection_name: str, task_ids: List[int]) -> DeleteResult: ...
+
+    def delete_document_by_id(self, db_name: str, collection_name: str, task_id: int) -> DeleteResult: ...
+
+    def delete_and_return_document_by_id(self, db_name: str, collection_name: str,
+                                         task_id: int) -> Mapping[str, Any] | None: ...
+
+    def delete_all_documents(self, db_name: str, collection_name: str, query: dict) -> DeleteResult: ...
+
+
+def create_store(backend: str | None = None) -> ToDoStorage:
+    """
+    Build the storage engine named by ``backend`` (default: the ``TODO_STORAGE_BACKEND`` setting), wrapped so its
+    calls show up in the metrics.
+    """
+    backend = backend or settings.storage_backend
+    if backend == "mongo":
+        return InstrumentedStore(ToDoDBStore())
+    if backend == "memory":
+        return InstrumentedStore(InMemoryToDoDBStore())
+    raise ValueError(f"Unknown storage backend '{backend}', expected 'mongo' or 'memory'")
@@ -0,0 +1,90 @@
+import asyncio
+
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+from pymongo.errors import BulkWriteError, WriteError
+
+from utils.config import settings
+
+
+class WriteBatcher:
+    """
+    Coalesces inserts submitted concurrently on one event loop into a single ``insert_many`` call.
+
+    A batch is written once it holds ``max_batch_size`` documents or ``max_delay_seconds`` after its first document
+    arrived, whichever comes first, so an insert waits at most that long before its round trip starts. Each caller
+    gets back its own document (with the ``_id`` and ``id`` the store assigned) or the error for that document only.
+
+    A caller that is cancelled while waiting does not take its document out of the batch.
+    """
+
+    def __init__(self, insert_many: Callable[[List[dict]], Awaitable[Any]], max_batch_size: int = 100,
+                 max_delay_seconds: float = 0.002):
+        self.insert_many = insert_many
+        self.max_batch_size = max_batch_size
+        self.max_delay_seconds = max_delay_seconds
+        self._pending: List[Tuple[dict, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._writes: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.documents = 0
+
+    async def submit(self, document: dict) -> dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((document, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay_seconds, self._flush)
+        return await future
+
+    async def drain(self):
+        """
+        Write whatever is pending now and wait for every batch still in flight.
+        """
+        self._flush()
+        if self._writes:
+            await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            write = asyncio.get_running_loop().create_task(self._write(batch))
+            self._writes.add(write)
+            write.add_done_callback(self._writes.discard)
+
+    async def _write(self, batch: List[Tuple[dict, asyncio.Future]]):
+        documents = [document for document, _ in batch]
+        self.batches += 1
+        self.documents += len(documents)
+        try:
+            await self.insert_many(documents)
+            failed = {}
+        except BulkWriteError as e:
+            failed = {error["index"]: error for error in e.details.get("writeErrors", [])}
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for index, (document, future) in enumerate(batch):
+            if future.done():
+                continue
+            if index in failed:
+                future.set_exception(WriteError(failed[index]["errmsg"], failed[index].get("code"), failed[index]))
+            else:
+                future.set_result(document)
+
+    def stats(self) -> Dict[str, float]:
+        return {"batches": self.batches, "documents": self.documents,
+                "mean_batch_size": self.documents / self.batches if self.batches else 0.0}
+
+
+def write_batcher_from_settings(insert_many: Callable[[List[dict]], Awaitable[Any]]) -> WriteBatcher | None:
+    if not settings.write_batch_enabled:
+        return None
+    return WriteBatcher(insert_many, settings.write_batch_max_size, settings.write_batch_max_delay_ms / 1000)